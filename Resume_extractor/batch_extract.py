@@ -0,0 +1,290 @@
+import os
+import sys
+import time
+import random
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from pdf_text import extract_text_from_pdf
+from near_duplicates import Match, NearDuplicateIndex, minhash, similarity, text_diff
+from resume_extraction import extract_resume_details, extraction_cache, extraction_cache_key, get_cached_extraction
+from resume_store import RESUMES_DB_PATH, get_resume, init_store, list_skills, save_resume
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.tracing import count, span, start_trace
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 1.0
+
+# Every extracted resume text, so new versions of a CV can be recognised
+# before they are sent to the LLM
+near_duplicate_index = NearDuplicateIndex()
+
+# The record a near-duplicate match stands for: the saved resume if it was
+# saved, otherwise its cached extraction (None if neither is available)
+def matched_record(match, db_path=RESUMES_DB_PATH):
+    record = get_resume(match.resume_id, db_path) if match.resume_id is not None else None
+    if record is None and match.cache_key is not None:
+        record = extraction_cache.get(match.cache_key)
+    return record
+
+# Call the LLM for one resume, retrying failed calls with exponential backoff + jitter
+def extract_with_retries(resume_text, max_retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, cache_key=None,
+                         skill_vocabulary=()):
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            extracted_json, raw = extract_resume_details(resume_text, cache_key=cache_key,
+                                                         skill_vocabulary=skill_vocabulary)
+            return extracted_json, raw, attempt
+        except Exception:
+            if attempt > max_retries:
+                raise
+            count("retries")
+            time.sleep(backoff * (2 ** (attempt - 1)) + random.uniform(0, backoff))
+
+# Runs in the PDF process pool; the time is added to the resume's trace in the parent
+def _timed_pdf_text(pdf):
+    start = time.perf_counter()
+    text = extract_text_from_pdf(pdf)
+    return text, time.perf_counter() - start
+
+# One traced extraction per resume, run on the LLM thread pool. Only a
+# successful extraction is added to the near-duplicate index; returns
+# (data, raw, attempts, doc_id).
+def _traced_extract(name, resume_text, pdf_seconds, max_retries, backoff, cache_key, skill_vocabulary):
+    with start_trace("resume_extract", file=name, batch=True) as trace:
+        trace.add_stage("pdf_text", pdf_seconds)
+        count("cache_misses")
+        extracted_json, raw, attempts = extract_with_retries(resume_text, max_retries, backoff, cache_key,
+                                                             skill_vocabulary)
+        trace.annotate(attempts=attempts, parsed=extracted_json is not None)
+        doc_id = near_duplicate_index.add(resume_text, name, cache_key) if extracted_json is not None else None
+        return extracted_json, raw, attempts, doc_id
+
+# Run a batch of resumes through PDF extraction and the LLM.
+# `pdfs` is an iterable of (name, path_or_bytes). Resumes already in the
+# extraction cache are yielded straight away; the rest go through PDF text
+# extraction in a process pool and LLM calls in a thread pool bounded by
+# `concurrency`. One result dict is yielded per resume as soon as it finishes,
+# in completion order:
+#   {"source", "data", "raw", "error", "attempts", "seconds", "cached", "duplicate_of", "resume_id", "doc_id"}
+# With skip_near_duplicates, a resume whose text is a near duplicate of an
+# already extracted one reuses that record instead of calling the LLM
+# (duplicate_of names the original; resume_id is set if it was saved). A
+# near duplicate of a resume still being extracted in the same batch waits
+# for that extraction instead.
+def extract_batch(pdfs, concurrency=DEFAULT_CONCURRENCY, max_retries=DEFAULT_RETRIES,
+                  backoff=DEFAULT_BACKOFF, pdf_workers=None, skill_vocabulary=(), skip_near_duplicates=True,
+                  db_path=RESUMES_DB_PATH):
+    # Per-resume state is keyed by position in the batch: two uploads can
+    # share a file name but not their content (or cache key)
+    names, started, cache_keys = [], [], []
+    # spawn keeps the PDF workers free of the parent's threads (Streamlit, LLM pool)
+    mp_context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=pdf_workers, mp_context=mp_context) as pdf_pool, \
+            ThreadPoolExecutor(max_workers=concurrency) as llm_pool:
+        text_futures = {}
+        for i, (name, pdf) in enumerate(pdfs):
+            names.append(name)
+            started.append(time.perf_counter())
+            if not isinstance(pdf, (bytes, bytearray, memoryview)):
+                with open(pdf, "rb") as f:
+                    pdf = f.read()
+            cache_keys.append(extraction_cache_key(pdf))
+            cached = get_cached_extraction(cache_keys[i])
+            if cached is not None:
+                with start_trace("resume_extract", file=name, batch=True):
+                    count("cache_hits")
+                yield _result(name, started[i], data=cached, cached=True)
+                continue
+            text_futures[pdf_pool.submit(_timed_pdf_text, pdf)] = i
+        llm_futures = {}
+        # MinHash signatures of the resumes being extracted, and the resumes of
+        # this batch that are near duplicates of one and wait for its extraction
+        in_flight = {}
+        waiting = {}
+        pending = set(text_futures)
+
+        def in_flight_match(resume_text):
+            signature = minhash(resume_text)
+            scores = [(similarity(signature, other), j) for j, other in in_flight.items()]
+            best = max(scores, default=None)
+            return best if best is not None and best[0] >= near_duplicate_index.threshold else None
+
+        def submit_llm(i, resume_text, pdf_seconds):
+            in_flight[i] = minhash(resume_text)
+            waiting[i] = []
+            llm_future = llm_pool.submit(_traced_extract, names[i], resume_text, pdf_seconds, max_retries,
+                                         backoff, cache_keys[i], skill_vocabulary)
+            llm_futures[llm_future] = i
+            pending.add(llm_future)
+
+        def reuse(i, data, match):
+            with start_trace("resume_extract", file=names[i], batch=True):
+                count("near_duplicates")
+            near_duplicate_index.record_avoided()
+            return _result(names[i], started[i], data=data, duplicate_of=match.source or f"#{match.doc_id}",
+                           resume_id=match.resume_id)
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in text_futures:
+                    i = text_futures.pop(future)
+                    try:
+                        resume_text, pdf_seconds = future.result()
+                    except Exception as e:
+                        yield _result(names[i], started[i], error=f"PDF extraction failed: {e}")
+                        continue
+                    original = in_flight_match(resume_text) if skip_near_duplicates else None
+                    if original is not None:
+                        waiting[original[1]].append((i, resume_text, pdf_seconds, original[0]))
+                        continue
+                    match = near_duplicate_index.find(resume_text) if skip_near_duplicates else None
+                    record = matched_record(match, db_path) if match is not None else None
+                    if record is not None:
+                        yield reuse(i, record, match)
+                        continue
+                    submit_llm(i, resume_text, pdf_seconds)
+                else:
+                    i = llm_futures.pop(future)
+                    del in_flight[i]
+                    duplicates = waiting.pop(i)
+                    try:
+                        extracted_json, raw, attempts, doc_id = future.result()
+                    except Exception as e:
+                        extracted_json = None
+                        yield _result(names[i], started[i], error=f"LLM extraction failed: {e}",
+                                      attempts=max_retries + 1)
+                    else:
+                        error = None if extracted_json is not None else "Could not parse LLM output as JSON."
+                        yield _result(names[i], started[i], data=extracted_json, raw=raw, error=error,
+                                      attempts=attempts, doc_id=doc_id)
+                    for duplicate, resume_text, pdf_seconds, score in duplicates:
+                        if extracted_json is not None:
+                            yield reuse(duplicate, extracted_json, Match(doc_id, score, names[i], cache_keys[i], None))
+                        else:
+                            # The original failed: extract its near duplicates after all
+                            submit_llm(duplicate, resume_text, pdf_seconds)
+
+def _result(name, started_at, data=None, raw=None, error=None, attempts=0, cached=False, duplicate_of=None,
+            resume_id=None, doc_id=None):
+    return {
+        "source": name,
+        "data": data,
+        "raw": raw,
+        "error": error,
+        "attempts": attempts,
+        "seconds": round(time.perf_counter() - started_at, 2),
+        "cached": cached,
+        "duplicate_of": duplicate_of,
+        "resume_id": resume_id,
+        "doc_id": doc_id,
+    }
+
+# Job queue handler for "resume_extract" jobs (the app's Extract Details
+# button); runs in a worker process. payload is {"name", "pdf", "force"} with
+# the PDF bytes. Fields are reported as they are extracted so the app can show
+# them while the LLM is still generating. A near duplicate of an already
+# extracted resume is returned as "duplicate" without calling the LLM, unless
+# force is set.
+def extract_pdf_job(payload, report):
+    with start_trace("resume_extract", file=payload["name"]):
+        cache_key = extraction_cache_key(payload["pdf"])
+        cached = get_cached_extraction(cache_key)
+        if cached is not None:
+            return {"data": cached, "raw": None, "cached": True}
+        with span("pdf_text"):
+            resume_text = extract_text_from_pdf(payload["pdf"])
+        if not payload.get("force"):
+            with span("near_duplicates"):
+                match = near_duplicate_index.find(resume_text)
+                record = matched_record(match) if match is not None else None
+            if record is not None:
+                count("near_duplicates")
+                return {"data": None, "raw": None, "cached": False, "duplicate": {
+                    "doc_id": match.doc_id,
+                    "similarity": match.similarity,
+                    "source": match.source,
+                    "resume_id": match.resume_id,
+                    "record": record,
+                    "diff": text_diff(near_duplicate_index.text(match.doc_id), resume_text),
+                }}
+        # Skills already seen in saved resumes are matched without the LLM
+        vocabulary = [name for _, name, _ in list_skills()]
+        fields = {}
+        def on_field(key, value):
+            fields[key] = value
+            report(fields)
+        extracted_json, raw = extract_resume_details(resume_text, cache_key=cache_key, skill_vocabulary=vocabulary,
+                                                     on_field=on_field)
+        doc_id = near_duplicate_index.add(resume_text, payload["name"], cache_key) if extracted_json is not None else None
+        return {"data": extracted_json, "raw": raw, "cached": False, "doc_id": doc_id}
+
+# Same as extract_batch, but saves every successfully parsed resume to the store
+# as soon as it comes back (near duplicates of a saved record are not saved
+# again; saves are deduplicated by email/phone anyway).
+def extract_and_save_batch(pdfs, db_path=RESUMES_DB_PATH, **kwargs):
+    kwargs.setdefault("skill_vocabulary", [name for _, name, _ in list_skills(db_path)])
+    for result in extract_batch(pdfs, db_path=db_path, **kwargs):
+        if result["data"] is not None and result["resume_id"] is None:
+            result["resume_id"] = save_resume(result["data"], db_path)
+            if result["doc_id"] is not None:
+                near_duplicate_index.link_resume(result["doc_id"], result["resume_id"])
+        yield result
+
+def iter_pdf_dir(directory):
+    for entry in sorted(os.listdir(directory)):
+        if entry.lower().endswith(".pdf"):
+            yield entry, os.path.join(directory, entry)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract and save every PDF resume in a directory.")
+    parser.add_argument("directory", help="Directory containing PDF resumes")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Maximum number of concurrent LLM calls")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES,
+                        help="Retries per resume when the LLM call fails")
+    parser.add_argument("--backoff", type=float, default=DEFAULT_BACKOFF,
+                        help="Base backoff in seconds between retries (doubles each retry)")
+    parser.add_argument("--pdf-workers", type=int, default=None,
+                        help="Processes used for PDF text extraction (default: CPU count)")
+    parser.add_argument("--db", default=RESUMES_DB_PATH, help="SQLite resume store to save results to")
+    parser.add_argument("--no-dedupe", action="store_true",
+                        help="Extract near-duplicate resumes with the LLM instead of reusing the earlier record")
+    args = parser.parse_args(argv)
+
+    pdfs = list(iter_pdf_dir(args.directory))
+    if not pdfs:
+        print(f"No PDF files found in {args.directory}")
+        return 1
+
+    init_store(args.db)
+    start = time.perf_counter()
+    saved = failed = 0
+    results = extract_and_save_batch(
+        pdfs, db_path=args.db, concurrency=args.concurrency, max_retries=args.retries,
+        backoff=args.backoff, pdf_workers=args.pdf_workers, skip_near_duplicates=not args.no_dedupe,
+    )
+    for idx, result in enumerate(results, 1):
+        if result["error"]:
+            failed += 1
+            status = f"FAILED ({result['error']})"
+        else:
+            saved += 1
+            if result["duplicate_of"]:
+                status = f"reused (near duplicate of {result['duplicate_of']})"
+            else:
+                status = "saved (cached)" if result["cached"] else "saved"
+        print(f"[{idx}/{len(pdfs)}] {result['source']}: {status} in {result['seconds']}s")
+    elapsed = time.perf_counter() - start
+    print(f"Done: {saved} saved, {failed} failed in {elapsed:.1f}s "
+          f"({len(pdfs) / elapsed:.2f} resumes/s)")
+    return 0 if failed == 0 else 2
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+import os
+import sys
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.bench import add_bench_arguments, configure_llm, parse_levels, print_report, run_benchmark, write_json
+from common.tracing import span, start_trace
+
+# Benchmark resume extraction (PDF text + LLM + validation/repair) over a
+# directory of PDFs at several concurrency levels. The extraction cache is
+# bypassed, so every request does the full work. Record completions once with
+# --llm record, then benchmark offline with the default --llm replay.
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark resume extraction over a directory of PDFs.")
+    parser.add_argument("directory", help="Directory containing PDF resumes")
+    add_bench_arguments(parser)
+    args = parser.parse_args(argv)
+
+    configure_llm(args)
+    # Imported only now, so the LLM is built with the settings above
+    from batch_extract import iter_pdf_dir
+    from pdf_text import extract_text_from_pdf
+    from resume_extraction import extract_resume_details
+
+    pdfs = []
+    for name, path in iter_pdf_dir(args.directory):
+        with open(path, "rb") as f:
+            pdfs.append((name, f.read()))
+    if not pdfs:
+        print(f"No PDF files found in {args.directory}")
+        return 1
+
+    def extract(pdf):
+        name, pdf_bytes = pdf
+        with start_trace("resume_extract", file=name, bench=True):
+            with span("pdf_text"):
+                resume_text = extract_text_from_pdf(pdf_bytes)
+            extracted_json, _ = extract_resume_details(resume_text)
+            if extracted_json is None:
+                raise ValueError("Could not parse LLM output as JSON.")
+
+    results = run_benchmark(extract, pdfs, parse_levels(args.concurrency), "resume_extract", args.repeat)
+    name = f"Resume extraction ({len(pdfs)} PDFs x {args.repeat}, llm={args.llm})"
+    print_report(name, results)
+    if args.json_path:
+        write_json(args.json_path, name, args, results)
+    return 0 if all(r["errors"] == 0 for r in results) else 2
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+CACHE_PATH = "extraction_cache.db"
+DEFAULT_MAX_ENTRIES = 5000
+
+# Content-addressed cache of LLM extractions. Entries are keyed by the hash of
+# the PDF bytes, the model name and the instruction prompt, so changing either
+# the model or the prompt naturally misses instead of serving stale output.
+# Least recently used entries are evicted once max_entries is exceeded.
+class ExtractionCache:
+    def __init__(self, path=CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS extractions (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        ''')
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_extractions_last_used ON extractions(last_used)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(pdf_bytes, model, prompt):
+        digest = hashlib.sha256()
+        for part in (hashlib.sha256(pdf_bytes).hexdigest(), model, hashlib.sha256(prompt.encode("utf-8")).hexdigest()):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM extractions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._bump("misses")
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE extractions SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._bump("hits")
+            self._conn.commit()
+            return json.loads(row[0])
+
+    def put(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._conn.execute('''
+                INSERT INTO extractions (key, value, created, last_used) VALUES (?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value, last_used = excluded.last_used
+            ''', (key, json.dumps(value, ensure_ascii=False), now, now))
+            self._evict()
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._conn.execute("SELECT name, value FROM counters").fetchall())
+            entries = self._conn.execute("SELECT COUNT(*) FROM extractions").fetchone()[0]
+        return {
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "evictions": counters.get("evictions", 0),
+            "entries": entries,
+            "max_entries": self.max_entries,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM extractions")
+            self._conn.execute("DELETE FROM counters")
+            self._conn.commit()
+
+    def _bump(self, name, by=1):
+        self._conn.execute('''
+            INSERT INTO counters (name, value) VALUES (?, ?)
+            ON CONFLICT(name) DO UPDATE SET value = value + excluded.value
+        ''', (name, by))
+
+    def _evict(self):
+        excess = self._conn.execute("SELECT COUNT(*) FROM extractions").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self._conn.execute('''
+                DELETE FROM extractions WHERE key IN (
+                    SELECT key FROM extractions ORDER BY last_used ASC LIMIT ?
+                )
+            ''', (excess,))
+            self._bump("evictions", excess)
@@ -0,0 +1,77 @@
+import json
+
+# Incremental parser for the first top-level JSON object in a stream of text
+# chunks (e.g. LLM tokens). It tracks string/escape state, so braces inside
+# string values don't confuse it, and reports each top-level key as soon as its
+# value is complete, so callers can show name/email/skills before the rest of
+# the object has been generated.
+class IncrementalJsonParser:
+    def __init__(self):
+        self.text = ""
+        self.start = None
+        self.end = None
+        self.fields = {}
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member_start = None
+
+    @property
+    def done(self):
+        return self.end is not None
+
+    # Consume a chunk; returns the top-level keys completed by it, in order
+    def feed(self, chunk):
+        completed = []
+        if self.done:
+            return completed
+        self.text += chunk
+        text = self.text
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+            if self.start is None:
+                if ch == "{":
+                    self.start = i
+                    self._depth = 1
+                    self._member_start = i + 1
+                continue
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    completed.extend(self._close_member(i))
+                    self.end = i
+                    self._pos = i + 1
+                    return completed
+            elif ch == "," and self._depth == 1:
+                completed.extend(self._close_member(i))
+        self._pos = len(text)
+        return completed
+
+    def _close_member(self, i):
+        member = self.text[self._member_start:i].strip()
+        self._member_start = i + 1
+        if not member:
+            return []
+        try:
+            parsed = json.loads("{" + member + "}")
+        except ValueError:
+            return []
+        self.fields.update(parsed)
+        return list(parsed)
+
+    # Text of the first complete object, or None if it hasn't closed yet
+    def object_text(self):
+        return self.text[self.start:self.end + 1] if self.done else None
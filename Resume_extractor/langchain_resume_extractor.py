@@ -1,152 +1,147 @@
 import streamlit as st
 import os
-import tempfile
-import json
-from langchain_core.prompts import PromptTemplate
-from langchain_together import Together
-import fitz
-
-# Helper to extract only the first valid JSON object from a string
-def extract_first_json_object(text):
-    start = text.find('{')
-    if start == -1:
-        return None
-    count = 0
-    for i in range(start, len(text)):
-        if text[i] == '{':
-            count += 1
-        elif text[i] == '}':
-            count -= 1
-            if count == 0:
-                return text[start:i+1]
-    return None
-
-os.environ["TOGETHER_API_KEY"] = "YOUR API KEY"
-
-llm = Together(
-    model="meta-llama/Llama-4-Scout-17B-16E-Instruct",
-    max_tokens=2000,
-    temperature=0
+import sys
+import time
+import base64
+from resume_extraction import extraction_cache
+from resume_store import (
+    count_search_results, init_store, list_skills, load_resumes, load_summaries, query_skills, save_resume,
+    search_resumes, store_version,
 )
+from batch_extract import extract_and_save_batch, near_duplicate_index, DEFAULT_CONCURRENCY, DEFAULT_RETRIES
 
-# Step 1: PDF extraction function
-def extract_text_from_pdf(pdf_path):
-    doc = fitz.open(pdf_path)
-    text = "".join([page.get_text() for page in doc])
-    doc.close()
-    return text
-
-# Step 2: Instruction Prompt (escaped correctly)
-INSTRUCTION_PROMPT ="""
-You are a resume information extractor. Given a candidate's resume text, extract the following details and return them in a single, valid JSON object with these exact keys and structure:
-
-- name: (string, candidate's full name)
-- email: (string, candidate's email address)
-- phone: (string, candidate's phone number)
-- skills: (list of strings, e.g. ["Python", "SQL", "Machine Learning"])
-- work_experience: (list of objects, each with the following keys:)
-    - Designation: (string, job title or role)
-    - Company: (string, company name)
-    - Duration: (string, e.g. "Jan 2024 - June 2024")
-    - Duration_years: (integer, total years in this role)
-    - Duration_months: (integer, additional months in this role, if any)
-    - Projects: (list of objects, each with:)
-        - Title: (string, project title)
-        - Description: (string, short and summarized project description)
-
-For each work experience, calculate and include the duration in both years and months (e.g., "Jul 2024 - Dec 2024" = 0 years, 6 months).
-If any field is missing in the resume, set its value to null or an empty list as appropriate.
-
-NOTE : STRICTLY ADHERE TO THE ABOVE FORMAT ONLY AND DO NOT INCLUDE ANYTHING EXTRA. 
-The response should directly start with json wihtout any characters like '```'
-
-Example output:
-{{
-  "name": "Meghan Challa",
-  "email": "meghan@email.com",
-  "phone": "+91-1234567890",
-  "skills": ["Python", "SQL", "Machine Learning"],
-  "work_experience": [
-    {{
-      "Designation": "AI/ML, Data Scientist",
-      "Company": "Genpact",
-      "Duration": "Jul 2024 - Dec 2024",
-      "Duration_years": 0,
-      "Duration_months": 6,
-      "Projects": [
-        {{
-          "Title": "Human-in-the-Loop Pipeline: Refining Prompt Tuning with Human Feedback Integration",
-          "Description": "Developed an interactive Human-in-the-Loop (HITL) pipeline to enhance entity extraction accuracy by using human feedback for prompt tuning as few shot examples."
-        }}
-      ]
-    }}
-  ]
-}}
-
-Extract the details as accurately as possible and return only the JSON.
-if the projects are not explicitly mentioned, summarize the work experience in that particular company
-
-The below is the candidate resume:
-{candidate_resume}
-"""
-
-prompt_template = PromptTemplate.from_template(INSTRUCTION_PROMPT)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.jobs import JobQueue
+from common.tracing import render_diagnostics
 
 st.title("Resume Skill Extractor")
 
+# Create the resume store (and import the legacy resumes.json) once per server process
+@st.cache_resource
+def open_resume_store():
+    return init_store()
+
+open_resume_store()
+
+PAGE_SIZES = [10, 25, 50, 100]
+# Worker processes running extractions, shared by every session
+JOB_WORKERS = 4
+JOB_POLL_SECONDS = 1.0
+
+# One queue and worker pool per server process: extractions run in the
+# workers, so a slow LLM response never blocks a session's script run
+@st.cache_resource
+def get_job_queue():
+    queue = JobQueue()
+    queue.start_workers({"resume_extract": "batch_extract:extract_pdf_job"}, processes=JOB_WORKERS)
+    return queue
+
+job_queue = get_job_queue()
+poll_job = False
+
+# Re-read the skill list only after a save, not on every widget change
+@st.cache_data
+def cached_skills(version):
+    return list_skills()
+
 if 'extracted_json' not in st.session_state:
     st.session_state['extracted_json'] = None
 
-import os
-
 # Tab UI
-tab1, tab2 = st.tabs(["Extract Resume", "All Resumes"])
+tab1, tab2, tab3 = st.tabs(["Extract Resume", "All Resumes", "Batch Extract"])
 
 with tab1:
     with st.sidebar:
         uploaded_file = st.file_uploader("Upload your resume (PDF)", type=["pdf"])
-        temp_file_path = None
-        all_text = None
         if uploaded_file is not None:
-            # Save uploaded file to a temp location
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-                tmp_file.write(uploaded_file.read())
-                temp_file_path = tmp_file.name
+            # The upload stays in memory: the same bytes feed the preview, the
+            # cache key and PyMuPDF, and nothing is written to disk.
+            pdf_bytes = uploaded_file.getvalue()
             st.success(f"Uploaded: {uploaded_file.name}")
 
             # Show PDF preview only after upload
             st.subheader("Resume Preview (PDF)")
-            import base64
-            with open(temp_file_path, "rb") as f:
-                base64_pdf = base64.b64encode(f.read()).decode("utf-8")
+            base64_pdf = base64.b64encode(pdf_bytes).decode("utf-8")
             pdf_display = f'<iframe src="data:application/pdf;base64,{base64_pdf}" width="400" height="500" type="application/pdf"></iframe>'
             st.markdown(pdf_display, unsafe_allow_html=True)
 
-            # Extract text from PDF (for later extraction)
-            all_text = extract_text_from_pdf(temp_file_path)
             # Button to extract details
             if st.button("Extract Details"):
-                with st.spinner("Extracting details from resume using LLM..."):
-                    try:
-                        response = (prompt_template | llm).invoke({"candidate_resume": all_text})
-                        print("LLM raw response:\n", response)
-                        # Check for triple backticks and strip them
-                        cleaned_response = response.strip()
-                        if cleaned_response.startswith("```") and cleaned_response.endswith("```"):
-                            cleaned_response = cleaned_response[3:-3].strip()
-                        # Extract only the first valid JSON object using bracket counting
-                        json_str = extract_first_json_object(cleaned_response)
-                        print("Extracted JSON string for parsing:\n", json_str)
-                        # Try to parse JSON safely
-                        try:
-                            extracted_json = json.loads(json_str)
-                        except Exception:
-                            st.warning("Could not parse LLM output as JSON. Showing raw output.")
-                            extracted_json = cleaned_response
-                        st.session_state['extracted_json'] = extracted_json
-                    except Exception as e:
-                        st.error(f"Failed to extract details: {e}")
-                        st.session_state['extracted_json'] = None
+                st.session_state['extracted_json'] = None
+                st.session_state['duplicate'] = None
+                st.session_state['extract_job'] = job_queue.submit(
+                    "resume_extract", {"name": uploaded_file.name, "pdf": pdf_bytes}
+                )
+                st.query_params["job"] = st.session_state['extract_job']
+
+        # The job ID is also kept in the URL, so a reconnecting browser picks
+        # up the result of an extraction it started before
+        job_id = st.session_state.get('extract_job') or st.query_params.get("job")
+        if job_id and st.session_state.get('finished_job') != job_id:
+            job = job_queue.get(job_id)
+            if job is None:
+                st.session_state['extract_job'] = None
+                st.query_params.pop("job", None)
+            elif not job.finished:
+                poll_job = True
+                if job.status == "queued":
+                    st.info(f"Queued behind {job.position} other extraction(s)...")
+                else:
+                    st.info(f"Extracting details from resume using LLM... ({job.seconds:.0f}s)")
+                # Show each field as soon as it has been extracted
+                if job.progress:
+                    st.json(job.progress)
+            else:
+                st.session_state['finished_job'] = job_id
+                st.session_state['extracted_doc'] = job.result.get("doc_id") if job.status == "done" else None
+                if job.status == "done" and job.result.get("duplicate"):
+                    # Near duplicate of a resume extracted before: let the user
+                    # decide whether it needs an LLM call at all
+                    st.session_state['duplicate'] = job.result["duplicate"]
+                    st.session_state['extracted_json'] = None
+                elif job.status == "done" and job.result["cached"]:
+                    # Same PDF, model and prompt as an earlier extraction: no LLM call needed
+                    st.session_state['extracted_json'] = job.result["data"]
+                    st.info("Loaded previously extracted details from cache.")
+                elif job.status == "done" and job.result["data"] is None:
+                    st.warning("Could not parse LLM output as JSON. Showing raw output.")
+                    st.session_state['extracted_json'] = job.result["raw"]
+                elif job.status == "done":
+                    st.session_state['extracted_json'] = job.result["data"]
+                else:
+                    st.error(f"Failed to extract details: {job.error}")
+                    st.session_state['extracted_json'] = None
+
+        duplicate = st.session_state.get('duplicate')
+        if duplicate:
+            st.warning(f"This resume is a {duplicate['similarity']:.0%} match for "
+                       f"{duplicate['source'] or 'a resume'} extracted earlier.")
+            with st.expander("What changed"):
+                st.code(duplicate['diff'] or "No text changes.", language="diff")
+            if st.button("Use existing record"):
+                st.session_state['extracted_json'] = duplicate['record']
+                st.session_state['extracted_doc'] = duplicate['doc_id']
+                st.session_state['duplicate'] = None
+                near_duplicate_index.record_avoided()
+                st.rerun()
+            if uploaded_file is not None and st.button("Extract anyway"):
+                st.session_state['duplicate'] = None
+                st.session_state['extract_job'] = job_queue.submit(
+                    "resume_extract", {"name": uploaded_file.name, "pdf": uploaded_file.getvalue(), "force": True}
+                )
+                st.query_params["job"] = st.session_state['extract_job']
+                st.rerun()
+
+        cache_stats = extraction_cache.stats()
+        st.caption(f"Extraction cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+                   f"({cache_stats['entries']}/{cache_stats['max_entries']} entries)")
+        dedupe_stats = near_duplicate_index.stats()
+        st.caption(f"Near duplicates: {dedupe_stats['duplicates_flagged']} reused, "
+                   f"{dedupe_stats['llm_calls_avoided']} LLM calls avoided ({dedupe_stats['documents']} resumes indexed)")
+
+        # Latency percentiles per stage and LLM/cache counters from metrics.jsonl
+        with st.expander("Diagnostics"):
+            render_diagnostics(st, kind="resume_extract")
 
         # Show extracted JSON in the sidebar if available
         if st.session_state.get('extracted_json'):
@@ -180,50 +175,76 @@ with tab1:
                         st.markdown(f"&nbsp;&nbsp;- <b>{proj.get('Title', 'N/A')}</b>: {proj.get('Description', 'N/A')}", unsafe_allow_html=True)
         # Save Resume button below summary
         if st.button("Save Resume"):
-            file_path = "resumes.json"
-            resume = st.session_state['extracted_json']
-            import os
-            if os.path.exists(file_path):
-                with open(file_path, "r", encoding="utf-8") as f:
-                    try:
-                        resumes = json.load(f)
-                    except Exception:
-                        resumes = []
-            else:
-                resumes = []
-            resumes.append(resume)
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump(resumes, f, indent=2, ensure_ascii=False)
-            st.success("Resume saved to resumes.json!")
+            resume_id = save_resume(st.session_state['extracted_json'])
+            if st.session_state.get('extracted_doc') is not None:
+                near_duplicate_index.link_resume(st.session_state['extracted_doc'], resume_id)
+            st.success("Resume saved!")
 
 with tab2:
     st.title("All Saved Resumes")
-    file_path = "resumes.json"
-    if os.path.exists(file_path):
-        with open(file_path, "r", encoding="utf-8") as f:
-            try:
-                resumes = json.load(f)
-            except Exception:
-                resumes = []
-        if resumes:
-            # Get all unique skills
-            all_skills = set()
-            for res in resumes:
-                all_skills.update(res.get('skills', []))
-            all_skills = sorted(all_skills)
-            # Skill filter
-            selected_skills = st.multiselect("Filter by Skills", options=all_skills)
-            # Dynamic filtering: update instantly (AND filter)
-            if selected_skills:
-                filtered_resumes = [
-                    r for r in resumes if all(skill in r.get('skills', []) for skill in selected_skills)
-                ]
+    version = store_version()
+    if version:
+        # Full-text search over names, employers, designations and projects
+        search = st.text_input(
+            "Search experience and projects", placeholder='kafka, "data pipeline", company:genpact',
+            help='All words must match. Use "quotes" for phrases, prefix* for word starts, -word to exclude, and '
+                 'name:, company:, designation:, project: or description: to search one field.',
+        ).strip()
+        # Skill options come from the skill index, not a scan over every resume
+        skill_counts = cached_skills(version)
+        skill_labels = {key: f"{name} ({count})" for key, name, count in skill_counts}
+        skill_options = [key for key, _, _ in skill_counts]
+        # Skill filter
+        selected_skills = st.multiselect("Filter by Skills (must have all)", options=skill_options,
+                                         format_func=skill_labels.get)
+        col_any, col_none = st.columns(2)
+        any_skills = col_any.multiselect("Any of", options=skill_options, format_func=skill_labels.get)
+        excluded_skills = col_none.multiselect("Exclude", options=skill_options, format_func=skill_labels.get)
+        filters = {"all_of": selected_skills, "any_of": any_skills, "none_of": excluded_skills}
+        snippets = {}
+        if search:
+            # Ranked by BM25; if no resume has every word, show those with any
+            match_all = True
+            total = count_search_results(search, **filters)
+            if not total:
+                match_all = False
+                total = count_search_results(search, match_all=False, **filters)
+                if total:
+                    st.caption("No resume matches every word; showing resumes that match some of them.")
+        else:
+            # Dynamic filtering: update instantly (set operations on the skill index)
+            resume_ids = query_skills(**filters)
+            total = len(resume_ids)
+        # Show resumes, one page at a time
+        if total:
+            col_view, col_size, col_page = st.columns(3)
+            view_mode = col_view.radio("View", ["Table", "Detailed"], horizontal=True)
+            page_size = col_size.selectbox("Resumes per page", PAGE_SIZES, index=1)
+            page_count = (total + page_size - 1) // page_size
+            # Filters or page size changed under us: go back to the first page
+            if st.session_state.get('resume_page', 1) > page_count:
+                st.session_state['resume_page'] = 1
+            page = col_page.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, key='resume_page')
+            start = (page - 1) * page_size
+            if search:
+                # Only this page is ranked out and snippeted
+                hits = search_resumes(search, limit=page_size, offset=start, match_all=match_all, **filters)
+                page_ids = [hit["id"] for hit in hits]
+                snippets = {hit["id"]: hit["snippet"] for hit in hits}
             else:
-                filtered_resumes = resumes
-            # Show resumes
-            if filtered_resumes:
-                for idx, data in enumerate(filtered_resumes, 1):
+                page_ids = resume_ids[start:start + page_size]
+            st.caption(f"Showing {start + 1}-{start + len(page_ids)} of {total} resumes")
+            if view_mode == "Table":
+                if search:
+                    st.dataframe(hits, hide_index=True, use_container_width=True,
+                                 column_order=["name", "email", "snippet", "skills", "years_of_experience", "score"])
+                else:
+                    st.dataframe(load_summaries(page_ids), hide_index=True, use_container_width=True)
+            else:
+                for idx, (resume_id, data) in enumerate(zip(page_ids, load_resumes(resume_ids=page_ids)), start + 1):
                     st.markdown(f"<h2>Resume {idx}</h2>", unsafe_allow_html=True)
+                    if resume_id in snippets:
+                        st.markdown(f"> {snippets[resume_id]}")
                     st.markdown(f"<b>Name:</b> {data.get('name', 'N/A')}", unsafe_allow_html=True)
                     st.markdown(f"<b>Email:</b> {data.get('email', 'N/A')}", unsafe_allow_html=True)
                     st.markdown(f"<b>Phone:</b> {data.get('phone', 'N/A')}", unsafe_allow_html=True)
@@ -242,9 +263,37 @@ with tab2:
                                 for proj in projects:
                                     st.markdown(f"&nbsp;&nbsp;- <b>{proj.get('Title', 'N/A')}</b>: {proj.get('Description', 'N/A')}", unsafe_allow_html=True)
                     st.markdown("---")
-            else:
-                st.info("No resumes match the selected skills.")
         else:
-            st.info("No resumes saved yet.")
+            st.info("No resumes match the search and selected skills." if search else
+                    "No resumes match the selected skills.")
     else:
-        st.info("No resumes.json file found.")
+        st.info("No resumes saved yet.")
+
+with tab3:
+    st.title("Batch Resume Extraction")
+    batch_files = st.file_uploader("Upload resumes (PDF)", type=["pdf"], accept_multiple_files=True, key="batch_upload")
+    concurrency = st.slider("Concurrent LLM calls", min_value=1, max_value=32, value=DEFAULT_CONCURRENCY)
+    max_retries = st.number_input("Retries per resume", min_value=0, max_value=10, value=DEFAULT_RETRIES)
+    if batch_files and st.button("Extract & Save All"):
+        pdfs = [(f.name, f.getvalue()) for f in batch_files]
+        progress = st.progress(0.0, text=f"Extracting 0/{len(pdfs)} resumes...")
+        saved, reused, failed = 0, 0, []
+        results = extract_and_save_batch(pdfs, concurrency=concurrency, max_retries=int(max_retries))
+        for idx, result in enumerate(results, 1):
+            if result["error"]:
+                failed.append(result)
+            elif result["duplicate_of"]:
+                reused += 1
+            else:
+                saved += 1
+            progress.progress(idx / len(pdfs), text=f"Extracting {idx}/{len(pdfs)} resumes...")
+        st.success(f"Saved {saved} of {len(pdfs)} resumes"
+                   + (f", reused {reused} near duplicate(s) of earlier resumes" if reused else ""))
+        for result in failed:
+            st.error(f"{result['source']}: {result['error']}")
+
+# Check on a running extraction again shortly; each check is a short rerun,
+# not a script run blocked on the LLM
+if poll_job:
+    time.sleep(JOB_POLL_SECONDS)
+    st.rerun()
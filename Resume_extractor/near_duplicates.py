@@ -0,0 +1,195 @@
+import re
+import zlib
+import time
+import difflib
+import sqlite3
+import hashlib
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+INDEX_PATH = "near_duplicates.db"
+# Word n-grams compared between resume texts
+SHINGLE_WORDS = 5
+# MinHash signature length, split into BANDS LSH bands of NUM_PERM // BANDS
+# rows. 16 bands of 8 rows make pairs above ~0.7 Jaccard similarity very
+# likely to share a bucket, and pairs below ~0.5 unlikely to.
+NUM_PERM = 128
+BANDS = 16
+# Estimated Jaccard similarity at which a resume counts as a near duplicate
+SIMILARITY_THRESHOLD = 0.8
+MAX_DIFF_LINES = 200
+
+_MERSENNE_PRIME = (1 << 61) - 1
+# Fixed seed: signatures are stored, so the permutations must never change
+_rng = np.random.default_rng(20240601)
+_PERM_A = _rng.integers(1, 1 << 31, NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, 1 << 31, NUM_PERM, dtype=np.uint64)
+_WORD_RE = re.compile(r"\w+")
+
+def normalize_text(text):
+    return " ".join(_WORD_RE.findall(text.casefold()))
+
+def shingles(text):
+    words = normalize_text(text).split()
+    if len(words) < SHINGLE_WORDS:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))} if words else set()
+    return {
+        zlib.crc32(" ".join(words[i:i + SHINGLE_WORDS]).encode("utf-8"))
+        for i in range(len(words) - SHINGLE_WORDS + 1)
+    }
+
+# MinHash signature: for each of NUM_PERM hash functions (a*x + b mod p) the
+# minimum over the text's shingles. Two signatures agree in a fraction of
+# positions that estimates the Jaccard similarity of the shingle sets.
+def minhash(text):
+    hashed = np.fromiter(shingles(text), dtype=np.uint64)
+    if hashed.size == 0:
+        return np.full(NUM_PERM, _MERSENNE_PRIME, dtype=np.uint64)
+    return ((np.outer(hashed, _PERM_A) + _PERM_B) % _MERSENNE_PRIME).min(axis=0)
+
+def similarity(signature, other):
+    return float(np.mean(signature == other))
+
+def _band_buckets(signature):
+    rows = NUM_PERM // BANDS
+    return [
+        (band, int.from_bytes(hashlib.blake2b(signature[band * rows:(band + 1) * rows].tobytes(),
+                                              digest_size=8).digest(), "big", signed=True))
+        for band in range(BANDS)
+    ]
+
+def text_diff(old_text, new_text, max_lines=MAX_DIFF_LINES):
+    lines = list(difflib.unified_diff(old_text.splitlines(), new_text.splitlines(), "existing", "uploaded",
+                                      lineterm="", n=1))
+    if len(lines) > max_lines:
+        lines = lines[:max_lines] + [f"... ({len(lines) - max_lines} more lines)"]
+    return "\n".join(lines)
+
+# An indexed resume that a new text is a near duplicate of. cache_key and
+# resume_id point at its extraction (extraction cache) and saved record.
+@dataclass
+class Match:
+    doc_id: int
+    similarity: float
+    source: Optional[str]
+    cache_key: Optional[str]
+    resume_id: Optional[int]
+
+# Persistent MinHash/LSH index of every resume text that has been extracted.
+# Candidates come from LSH bucket lookups (an index seek per band), so a check
+# costs the same with 100 or 100k indexed resumes; candidates are confirmed by
+# comparing full signatures. The resume text is kept (compressed) for diffs.
+class NearDuplicateIndex:
+    def __init__(self, path=INDEX_PATH, threshold=SIMILARITY_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS documents (
+                id INTEGER PRIMARY KEY,
+                text_hash TEXT UNIQUE NOT NULL,
+                signature BLOB NOT NULL,
+                text BLOB NOT NULL,
+                source TEXT,
+                cache_key TEXT,
+                resume_id INTEGER,
+                created REAL NOT NULL
+            )
+        ''')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS lsh_buckets (
+                band INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                doc_id INTEGER NOT NULL REFERENCES documents(id),
+                PRIMARY KEY (band, bucket, doc_id)
+            ) WITHOUT ROWID
+        ''')
+        self._conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._conn.commit()
+
+    # The most similar indexed resume at or above the threshold, or None.
+    # exclude skips one document (e.g. the text's own entry).
+    def find(self, text, exclude=None):
+        signature = minhash(text)
+        buckets = _band_buckets(signature)
+        with self._lock:
+            candidates = set()
+            for band, bucket in buckets:
+                candidates.update(row[0] for row in self._conn.execute(
+                    "SELECT doc_id FROM lsh_buckets WHERE band = ? AND bucket = ?", (band, bucket)
+                ))
+            candidates.discard(exclude)
+            best = None
+            for doc_id in candidates:
+                row = self._conn.execute(
+                    "SELECT signature, source, cache_key, resume_id FROM documents WHERE id = ?", (doc_id,)
+                ).fetchone()
+                score = similarity(signature, np.frombuffer(row[0], dtype=np.uint64))
+                if score >= self.threshold and (best is None or score > best.similarity):
+                    best = Match(doc_id, score, row[1], row[2], row[3])
+        return best
+
+    # Index a resume text; returns its document id. Indexing the same text
+    # again returns the existing id and updates its links.
+    def add(self, text, source=None, cache_key=None, resume_id=None):
+        text_hash = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+        signature = minhash(text)
+        with self._lock:
+            row = self._conn.execute("SELECT id FROM documents WHERE text_hash = ?", (text_hash,)).fetchone()
+            if row is not None:
+                self._conn.execute('''
+                    UPDATE documents SET cache_key = COALESCE(?, cache_key), resume_id = COALESCE(?, resume_id)
+                    WHERE id = ?
+                ''', (cache_key, resume_id, row[0]))
+                self._conn.commit()
+                return row[0]
+            doc_id = self._conn.execute('''
+                INSERT INTO documents (text_hash, signature, text, source, cache_key, resume_id, created)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (text_hash, signature.tobytes(), zlib.compress(text.encode("utf-8")), source, cache_key,
+                  resume_id, time.time())).lastrowid
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO lsh_buckets (band, bucket, doc_id) VALUES (?, ?, ?)",
+                [(band, bucket, doc_id) for band, bucket in _band_buckets(signature)],
+            )
+            self._conn.commit()
+            return doc_id
+
+    def link_resume(self, doc_id, resume_id):
+        with self._lock:
+            self._conn.execute("UPDATE documents SET resume_id = ? WHERE id = ?", (resume_id, doc_id))
+            self._conn.commit()
+
+    def text(self, doc_id):
+        with self._lock:
+            row = self._conn.execute("SELECT text FROM documents WHERE id = ?", (doc_id,)).fetchone()
+        return zlib.decompress(row[0]).decode("utf-8") if row else None
+
+    # A match was reused instead of sending the resume to the LLM. Matches that
+    # are ignored (--no-dedupe, "Extract anyway") are not counted.
+    def record_avoided(self, llm_calls=1):
+        with self._lock:
+            self._bump("duplicates_flagged")
+            self._bump("llm_calls_avoided", llm_calls)
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._conn.execute("SELECT name, value FROM counters").fetchall())
+            documents = self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        return {
+            "documents": documents,
+            "duplicates_flagged": counters.get("duplicates_flagged", 0),
+            "llm_calls_avoided": counters.get("llm_calls_avoided", 0),
+        }
+
+    def _bump(self, name, by=1):
+        self._conn.execute('''
+            INSERT INTO counters (name, value) VALUES (?, ?)
+            ON CONFLICT(name) DO UPDATE SET value = value + excluded.value
+        ''', (name, by))
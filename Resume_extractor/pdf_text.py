@@ -0,0 +1,97 @@
+import re
+import fitz
+
+# Budgets for a single resume. Anything past these is almost always an attached
+# portfolio, transcript or scanned appendix rather than resume content.
+MAX_PAGES = 15
+MAX_CHARS = 60000
+# Longest text sent to the LLM in one prompt; longer documents are chunked
+CHUNK_CHARS = 12000
+
+# Lines shorter than this that repeat across pages are treated as headers/footers
+_BOILERPLATE_MAX_LEN = 80
+_PAGE_NUMBER_RE = re.compile(r"^\s*(page\s*)?\d+\s*((of|/)\s*\d+)?\s*$", re.IGNORECASE)
+
+# Open a PDF from a path or straight from an in-memory buffer (bytes, bytearray,
+# memoryview) without writing it to disk
+def _open_pdf(pdf):
+    if isinstance(pdf, memoryview):
+        pdf = pdf.obj if isinstance(pdf.obj, (bytes, bytearray)) and pdf.nbytes == len(pdf.obj) else pdf.tobytes()
+    if isinstance(pdf, (bytes, bytearray)):
+        return fitz.open(stream=pdf, filetype="pdf")
+    return fitz.open(pdf)
+
+# Yield the text of each page lazily, so only one page is held in memory at a time
+def iter_pdf_pages(pdf, max_pages=MAX_PAGES):
+    doc = _open_pdf(pdf)
+    try:
+        for page_number, page in enumerate(doc):
+            if max_pages is not None and page_number >= max_pages:
+                break
+            yield page.get_text()
+    finally:
+        doc.close()
+
+# Drop page numbers and running headers/footers (such as the candidate's name
+# or contact line) from the top and bottom lines of each page. A header/footer
+# line is one already seen at the edge of an earlier page; the first occurrence
+# is kept, so nothing is lost from single-page resumes.
+def _strip_boilerplate(pages, edge_lines=2):
+    seen = set()
+    for page_text in pages:
+        lines = page_text.splitlines()
+        content = [i for i, line in enumerate(lines) if line.strip()]
+        edges = set(content[:edge_lines] + content[-edge_lines:])
+        kept = []
+        page_edges = set()
+        for i, line in enumerate(lines):
+            if i in edges:
+                key = " ".join(line.split()).casefold()
+                if _PAGE_NUMBER_RE.match(key) or key in seen:
+                    continue
+                if len(key) <= _BOILERPLATE_MAX_LEN:
+                    page_edges.add(key)
+            kept.append(line)
+        seen.update(page_edges)
+        yield "\n".join(kept) + "\n"
+
+# Step 1: PDF extraction function
+# Accepts either a path on disk or the PDF contents in memory (e.g. an upload).
+# Stops reading once max_pages or max_chars is reached.
+def extract_text_from_pdf(pdf, max_pages=MAX_PAGES, max_chars=MAX_CHARS):
+    parts = []
+    total = 0
+    for page_text in _strip_boilerplate(iter_pdf_pages(pdf, max_pages)):
+        if max_chars is not None and total + len(page_text) > max_chars:
+            parts.append(page_text[:max_chars - total])
+            break
+        parts.append(page_text)
+        total += len(page_text)
+    return "".join(parts)
+
+# Split text into chunks of at most max_chars, breaking on blank lines (section
+# and paragraph boundaries) where possible and on line breaks otherwise.
+def chunk_text(text, max_chars=CHUNK_CHARS):
+    if len(text) <= max_chars:
+        return [text]
+    chunks = []
+    current = ""
+    for block in re.split(r"\n\s*\n", text):
+        pieces, joiner = [block], "\n\n"
+        if len(block) > max_chars:
+            pieces, joiner = block.splitlines(), "\n"
+        for piece in pieces:
+            while len(piece) > max_chars:
+                if current:
+                    chunks.append(current)
+                    current = ""
+                chunks.append(piece[:max_chars])
+                piece = piece[max_chars:]
+            separator = joiner if current else ""
+            if len(current) + len(separator) + len(piece) > max_chars:
+                chunks.append(current)
+                current, separator = "", ""
+            current += separator + piece
+    if current.strip():
+        chunks.append(current)
+    return chunks
@@ -0,0 +1,396 @@
+import os
+import re
+import sys
+import json
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import PromptTemplate
+from langchain_together import ChatTogether
+from extraction_cache import ExtractionCache
+from pdf_text import CHUNK_CHARS, chunk_text
+from rule_extraction import pre_extract
+from json_stream import IncrementalJsonParser
+from resume_schema import repair_target, validate_resume
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.llm_replay import wrap_llm
+from common.tracing import annotate, bind, count, record_llm_call, span
+
+# Helper to extract only the first valid JSON object from a string
+# (braces inside string values are ignored)
+def extract_first_json_object(text):
+    parser = IncrementalJsonParser()
+    parser.feed(text)
+    return parser.object_text()
+
+os.environ["TOGETHER_API_KEY"] = "YOUR API KEY"
+
+LLM_MODEL = "meta-llama/Llama-4-Scout-17B-16E-Instruct"
+
+# The chat client streams tokens over HTTP as they are generated (the Together
+# completion LLM has no streaming and returns the whole completion at once);
+# StrOutputParser keeps invoke/stream returning plain text.
+llm = ChatTogether(
+    model=LLM_MODEL,
+    max_tokens=2000,
+    temperature=0
+) | StrOutputParser()
+# Recorded/replayed stand-in when LLM_MODE is set (see common/llm_replay.py)
+llm = wrap_llm(llm)
+
+# Step 2: Instruction Prompt (escaped correctly)
+INSTRUCTION_PROMPT ="""
+You are a resume information extractor. Given a candidate's resume text, extract the following details and return them in a single, valid JSON object with these exact keys and structure:
+
+- name: (string, candidate's full name)
+- email: (string, candidate's email address)
+- phone: (string, candidate's phone number)
+- skills: (list of strings, e.g. ["Python", "SQL", "Machine Learning"])
+- work_experience: (list of objects, each with the following keys:)
+    - Designation: (string, job title or role)
+    - Company: (string, company name)
+    - Duration: (string, e.g. "Jan 2024 - June 2024")
+    - Duration_years: (integer, total years in this role)
+    - Duration_months: (integer, additional months in this role, if any)
+    - Projects: (list of objects, each with:)
+        - Title: (string, project title)
+        - Description: (string, short and summarized project description)
+
+For each work experience, calculate and include the duration in both years and months (e.g., "Jul 2024 - Dec 2024" = 0 years, 6 months).
+If any field is missing in the resume, set its value to null or an empty list as appropriate.
+
+NOTE : STRICTLY ADHERE TO THE ABOVE FORMAT ONLY AND DO NOT INCLUDE ANYTHING EXTRA. 
+The response should directly start with json wihtout any characters like '```'
+
+Example output:
+{{
+  "name": "Meghan Challa",
+  "email": "meghan@email.com",
+  "phone": "+91-1234567890",
+  "skills": ["Python", "SQL", "Machine Learning"],
+  "work_experience": [
+    {{
+      "Designation": "AI/ML, Data Scientist",
+      "Company": "Genpact",
+      "Duration": "Jul 2024 - Dec 2024",
+      "Duration_years": 0,
+      "Duration_months": 6,
+      "Projects": [
+        {{
+          "Title": "Human-in-the-Loop Pipeline: Refining Prompt Tuning with Human Feedback Integration",
+          "Description": "Developed an interactive Human-in-the-Loop (HITL) pipeline to enhance entity extraction accuracy by using human feedback for prompt tuning as few shot examples."
+        }}
+      ]
+    }}
+  ]
+}}
+
+Extract the details as accurately as possible and return only the JSON.
+if the projects are not explicitly mentioned, summarize the work experience in that particular company
+
+The below is the candidate resume:
+{candidate_resume}
+"""
+
+prompt_template = PromptTemplate.from_template(INSTRUCTION_PROMPT)
+
+RESUME_FIELDS = ["name", "email", "phone", "skills", "work_experience"]
+
+# Per-field pieces of INSTRUCTION_PROMPT, used to ask the LLM for only the
+# fields the rule-based pre-extractor could not fill in
+FIELD_SPECS = {
+    "name": "- name: (string, candidate's full name)",
+    "email": "- email: (string, candidate's email address)",
+    "phone": "- phone: (string, candidate's phone number)",
+    "skills": '- skills: (list of strings, e.g. ["Python", "SQL", "Machine Learning"])',
+    "work_experience": """- work_experience: (list of objects, each with the following keys:)
+    - Designation: (string, job title or role)
+    - Company: (string, company name)
+    - Duration: (string, e.g. "Jan 2024 - June 2024")
+    - Duration_years: (integer, total years in this role)
+    - Duration_months: (integer, additional months in this role, if any)
+    - Projects: (list of objects, each with:)
+        - Title: (string, project title)
+        - Description: (string, short and summarized project description)""",
+}
+
+EXAMPLE_OUTPUT = {
+    "name": "Meghan Challa",
+    "email": "meghan@email.com",
+    "phone": "+91-1234567890",
+    "skills": ["Python", "SQL", "Machine Learning"],
+    "work_experience": [
+        {
+            "Designation": "AI/ML, Data Scientist",
+            "Company": "Genpact",
+            "Duration": "Jul 2024 - Dec 2024",
+            "Duration_years": 0,
+            "Duration_months": 6,
+            "Projects": [
+                {
+                    "Title": "Human-in-the-Loop Pipeline: Refining Prompt Tuning with Human Feedback Integration",
+                    "Description": "Developed an interactive Human-in-the-Loop (HITL) pipeline to enhance entity extraction accuracy by using human feedback for prompt tuning as few shot examples."
+                }
+            ]
+        }
+    ]
+}
+
+def build_partial_prompt(fields, resume_text):
+    specs = "\n".join(FIELD_SPECS[field] for field in fields)
+    example = json.dumps({field: EXAMPLE_OUTPUT[field] for field in fields}, indent=2, ensure_ascii=False)
+    duration_note = ""
+    if "work_experience" in fields:
+        duration_note = ('For each work experience, calculate and include the duration in both years and months '
+                         '(e.g., "Jul 2024 - Dec 2024" = 0 years, 6 months).\n'
+                         'if the projects are not explicitly mentioned, summarize the work experience in that particular company\n')
+    return f"""
+You are a resume information extractor. Given a candidate's resume text, extract ONLY the following details and return them in a single, valid JSON object with these exact keys and structure:
+
+{specs}
+
+{duration_note}If any field is missing in the resume, set its value to null or an empty list as appropriate.
+
+NOTE : STRICTLY ADHERE TO THE ABOVE FORMAT ONLY AND DO NOT INCLUDE ANYTHING EXTRA. 
+The response should directly start with json wihtout any characters like '```'
+
+Example output:
+{example}
+
+Extract the details as accurately as possible and return only the JSON.
+
+The below is the candidate resume:
+{resume_text}
+"""
+
+# Step 3: Clean up the raw LLM response and parse the first JSON object in it.
+# Returns (parsed_json, cleaned_response); parsed_json is None if parsing failed.
+def parse_llm_response(response):
+    # Check for triple backticks and strip them
+    cleaned_response = response.strip()
+    if cleaned_response.startswith("```") and cleaned_response.endswith("```"):
+        cleaned_response = cleaned_response[3:-3].strip()
+    # Extract only the first valid JSON object
+    json_str = extract_first_json_object(cleaned_response)
+    try:
+        return json.loads(json_str), cleaned_response
+    except Exception:
+        return None, cleaned_response
+
+# Bump whenever extraction logic outside the prompts changes (rule-based
+# pre-extraction, validation), so results of the old logic stop being served
+EXTRACTION_VERSION = 2
+
+# Persistent cache of successful extractions, keyed by PDF bytes + model +
+# everything else that shapes the result
+extraction_cache = ExtractionCache()
+
+# Every prompt template actually sent (full, partial with all field specs and
+# example, repair) plus EXTRACTION_VERSION. The skill vocabulary is left out
+# on purpose: it grows with every save, which would invalidate the whole cache.
+@lru_cache(maxsize=1)
+def _extraction_fingerprint():
+    return "\0".join([
+        f"version {EXTRACTION_VERSION}",
+        INSTRUCTION_PROMPT,
+        build_partial_prompt(RESUME_FIELDS, "{resume_text}"),
+        REPAIR_PROMPT,
+    ])
+
+def extraction_cache_key(pdf_bytes):
+    return ExtractionCache.make_key(pdf_bytes, LLM_MODEL, _extraction_fingerprint())
+
+def get_cached_extraction(cache_key):
+    cached = extraction_cache.get(cache_key)
+    count("cache_hits" if cached is not None else "cache_misses")
+    return cached
+
+# Parallel LLM calls per oversized resume during map-reduce extraction
+MAP_CONCURRENCY = 4
+
+# Stream the LLM response through an incremental JSON parser. on_field(key, value)
+# is called as soon as each top-level key's value is complete, and the stream is
+# closed once the first JSON object closes, which drops the HTTP connection so
+# the server stops generating trailing tokens.
+def _extract_single(resume_text, fields=None, on_field=None):
+    if fields is None or len(fields) == len(RESUME_FIELDS):
+        prompt = prompt_template.format(candidate_resume=resume_text)
+    else:
+        prompt = build_partial_prompt(fields, resume_text)
+    parser = IncrementalJsonParser()
+    chunks = []
+    with span("llm"):
+        stream = llm.stream(prompt)
+        try:
+            for chunk in stream:
+                chunks.append(chunk)
+                for key in parser.feed(chunk):
+                    if on_field is not None:
+                        on_field(key, parser.fields[key])
+                if parser.done:
+                    break
+        finally:
+            stream.close()
+    response = "".join(chunks)
+    record_llm_call(prompt, response)
+    if parser.done:
+        try:
+            return json.loads(parser.object_text()), response.strip()
+        except ValueError:
+            pass
+    extracted_json, cleaned_response = parse_llm_response(response)
+    if extracted_json is None and parser.fields:
+        # Broken or truncated JSON: keep the top-level fields that did parse and
+        # let validation/repair ask for the rest
+        return dict(parser.fields), cleaned_response
+    return extracted_json, cleaned_response
+
+def _key(value):
+    return " ".join(str(value or "").split()).casefold()
+
+# Reduce step: merge per-chunk extractions into one resume. Scalar fields take
+# the first non-empty value, skills are unioned, and work experience entries for
+# the same company/designation are merged with their projects unioned by title.
+def merge_extractions(parts):
+    merged = {"name": None, "email": None, "phone": None, "skills": [], "work_experience": []}
+    skill_keys = set()
+    experiences = {}
+    for part in parts:
+        for field in ("name", "email", "phone"):
+            if not merged[field] and part.get(field):
+                merged[field] = part[field]
+        for skill in part.get("skills") or []:
+            if _key(skill) not in skill_keys:
+                skill_keys.add(_key(skill))
+                merged["skills"].append(skill)
+        for exp in part.get("work_experience") or []:
+            if not isinstance(exp, dict):
+                continue
+            exp_key = (_key(exp.get("Company")), _key(exp.get("Designation")))
+            if exp_key not in experiences:
+                experiences[exp_key] = dict(exp, Projects=[])
+                merged["work_experience"].append(experiences[exp_key])
+            target = experiences[exp_key]
+            for field, value in exp.items():
+                if field != "Projects" and target.get(field) in (None, "") and value not in (None, ""):
+                    target[field] = value
+            titles = {_key(p.get("Title")) for p in target["Projects"]}
+            for project in exp.get("Projects") or []:
+                if isinstance(project, dict) and _key(project.get("Title")) not in titles:
+                    titles.add(_key(project.get("Title")))
+                    target["Projects"].append(project)
+    return merged
+
+# Map step for resumes longer than one prompt: extract each chunk in parallel
+# and merge the results, so prompt size and latency stay bounded.
+def _extract_chunked(chunks, fields=None):
+    labelled = [f"(Part {i} of {len(chunks)} of the resume)\n{chunk}" for i, chunk in enumerate(chunks, 1)]
+    with ThreadPoolExecutor(max_workers=min(MAP_CONCURRENCY, len(chunks))) as pool:
+        results = list(pool.map(bind(lambda chunk: _extract_single(chunk, fields)), labelled))
+    annotate(chunks=len(chunks))
+    parts = [parsed for parsed, _ in results if isinstance(parsed, dict)]
+    if not parts:
+        return None, "\n\n".join(raw for _, raw in results)
+    merged = merge_extractions(parts)
+    return merged, json.dumps(merged, ensure_ascii=False)
+
+REPAIR_PROMPT = """
+Some fields extracted from the candidate resume below are missing or malformed.
+Return a single, valid JSON object whose keys are exactly the field paths listed under "Fields to fix", each mapped to its corrected value. Do not include any other keys.
+A key like work_experience[1] is a single work experience object (not a list).
+
+Fields to fix:
+{problems}
+
+Expected structure:
+{specs}
+
+NOTE : STRICTLY ADHERE TO THE ABOVE FORMAT ONLY AND DO NOT INCLUDE ANYTHING EXTRA. 
+The response should directly start with json wihtout any characters like '```'
+
+The below is the candidate resume:
+{candidate_resume}
+"""
+
+_EXPERIENCE_PATH_RE = re.compile(r"^work_experience\[(\d+)\]$")
+
+def _current_value(data, target):
+    match = _EXPERIENCE_PATH_RE.match(target)
+    if match:
+        return data["work_experience"][int(match.group(1))]
+    return data.get(target)
+
+def build_repair_prompt(data, errors, resume_text):
+    problems_by_target = {}
+    for path, message in errors:
+        problems_by_target.setdefault(repair_target(path), []).append(f"{path} {message}".strip())
+    problems = "\n".join(
+        f"- {target}: {'; '.join(messages)} (current value: "
+        f"{json.dumps(_current_value(data, target), ensure_ascii=False)})"
+        for target, messages in problems_by_target.items()
+    )
+    spec_fields = [f for f in RESUME_FIELDS if any(t.split("[")[0] == f for t in problems_by_target)]
+    specs = "\n".join(FIELD_SPECS[f] for f in spec_fields)
+    return REPAIR_PROMPT.format(problems=problems, specs=specs, candidate_resume=resume_text[:CHUNK_CHARS])
+
+# Validate an extraction against the schema (filling Duration_years/months
+# deterministically from Duration) and, if anything is missing or malformed,
+# send one small repair prompt for just those fields instead of re-extracting
+# the whole resume. Anything still invalid afterwards is left null/empty.
+def validate_and_repair(data, resume_text):
+    resume, errors = validate_resume(data)
+    if errors and isinstance(data, dict):
+        count("repairs")
+        count("repair_fields", len(errors))
+        annotate(repair_paths=[path for path, _ in errors])
+        prompt = build_repair_prompt(data, errors, resume_text)
+        with span("repair"):
+            response = llm.invoke(prompt)
+        record_llm_call(prompt, response)
+        repaired, _ = parse_llm_response(response)
+        if isinstance(repaired, dict):
+            data = dict(data)
+            requested = {repair_target(path) for path, _ in errors}
+            for target, value in repaired.items():
+                if target not in requested:
+                    continue
+                match = _EXPERIENCE_PATH_RE.match(target)
+                if match and isinstance(data.get("work_experience"), list) \
+                        and int(match.group(1)) < len(data["work_experience"]):
+                    data["work_experience"] = list(data["work_experience"])
+                    data["work_experience"][int(match.group(1))] = value
+                elif target in RESUME_FIELDS:
+                    data[target] = value
+            resume, errors = validate_resume(data)
+            if errors:
+                annotate(unrepaired=len(errors), unrepaired_paths=[path for path, _ in errors])
+    return resume.to_dict()
+
+# Pass cache_key (from extraction_cache_key) to store a successful extraction so
+# the same PDF is never sent to the LLM twice. skill_vocabulary (skills already
+# seen in saved resumes) lets the rule-based fast path fill in skills; name,
+# email and phone are found with regexes, and the LLM is only asked for the rest.
+# on_field(key, value) reports each field as soon as it is known.
+def extract_resume_details(resume_text, cache_key=None, skill_vocabulary=(), on_field=None):
+    known = pre_extract(resume_text, skill_vocabulary)
+    if on_field is not None:
+        for field, value in known.items():
+            on_field(field, value)
+    fields = [field for field in RESUME_FIELDS if field not in known]
+    annotate(rule_fields=sorted(known))
+    llm_on_field = None
+    if on_field is not None:
+        # Rule-based values win, so don't let the LLM overwrite them in the live view
+        llm_on_field = lambda key, value: on_field(key, value) if key not in known else None
+    chunks = chunk_text(resume_text, CHUNK_CHARS)
+    if len(chunks) == 1:
+        extracted_json, cleaned_response = _extract_single(resume_text, fields, llm_on_field)
+    else:
+        extracted_json, cleaned_response = _extract_chunked(chunks, fields)
+    if isinstance(extracted_json, dict):
+        extracted_json = validate_and_repair({**extracted_json, **known}, resume_text)
+        cleaned_response = json.dumps(extracted_json, ensure_ascii=False)
+    if cache_key is not None and extracted_json is not None:
+        extraction_cache.put(cache_key, extracted_json)
+    return extracted_json, cleaned_response
@@ -0,0 +1,210 @@
+import re
+import datetime
+from dataclasses import dataclass, asdict
+from typing import List, Optional
+
+from rule_extraction import EMAIL_RE
+
+# Typed schema for an extracted resume. Field names match the JSON keys the
+# prompt asks for, so asdict() gives back the existing JSON shape.
+
+@dataclass
+class Project:
+    __slots__ = ("Title", "Description")
+    Title: Optional[str]
+    Description: Optional[str]
+
+@dataclass
+class WorkExperience:
+    __slots__ = ("Designation", "Company", "Duration", "Duration_years", "Duration_months", "Projects")
+    Designation: Optional[str]
+    Company: Optional[str]
+    Duration: Optional[str]
+    Duration_years: Optional[int]
+    Duration_months: Optional[int]
+    Projects: List[Project]
+
+@dataclass
+class Resume:
+    __slots__ = ("name", "email", "phone", "skills", "work_experience")
+    name: Optional[str]
+    email: Optional[str]
+    phone: Optional[str]
+    skills: List[str]
+    work_experience: List[WorkExperience]
+
+    def to_dict(self):
+        return asdict(self)
+
+_MONTHS = {
+    name: number
+    for number, names in enumerate(
+        [("jan", "january"), ("feb", "february"), ("mar", "march"), ("apr", "april"), ("may",),
+         ("jun", "june"), ("jul", "july"), ("aug", "august"), ("sep", "sept", "september"),
+         ("oct", "october"), ("nov", "november"), ("dec", "december")], 1)
+    for name in names
+}
+_PRESENT = {"present", "current", "now", "till date", "to date", "ongoing", "today"}
+_RANGE_SPLIT_RE = re.compile(r"\s*(?:-|–|—|\bto\b|\btill\b|\buntil\b)\s*", re.IGNORECASE)
+_MONTH_YEAR_RE = re.compile(r"^([a-z]+)\.?,?\s*'?(\d{2}|\d{4})$")
+_NUMERIC_RE = re.compile(r"^(\d{1,2})[/.-](\d{4})$|^(\d{4})[/.-](\d{1,2})$")
+_YEAR_RE = re.compile(r"^(\d{4})$")
+_INT_RE = re.compile(r"-?\d+")
+
+# (year, month, has_month) for one end of a duration, or None if unparseable
+def _parse_date(text, today):
+    text = " ".join(text.strip().lower().split())
+    if text in _PRESENT:
+        return today.year, today.month, True
+    match = _MONTH_YEAR_RE.match(text)
+    if match and match.group(1) in _MONTHS:
+        year = int(match.group(2))
+        return (year + 2000 if year < 100 else year), _MONTHS[match.group(1)], True
+    match = _NUMERIC_RE.match(text)
+    if match:
+        month, year = (match.group(1), match.group(2)) if match.group(1) else (match.group(4), match.group(3))
+        if 1 <= int(month) <= 12:
+            return int(year), int(month), True
+    match = _YEAR_RE.match(text)
+    if match:
+        return int(match.group(1)), None, False
+    return None
+
+# Deterministic (years, months) for a Duration string such as "Jul 2024 - Dec 2024"
+# (0 years, 6 months: both end months count). Year-only ranges ("2021 - 2023")
+# count whole years. Returns None when the string can't be parsed.
+def parse_duration(duration, today=None):
+    if not isinstance(duration, str):
+        return None
+    today = today or datetime.date.today()
+    parts = _RANGE_SPLIT_RE.split(duration.strip(), maxsplit=1)
+    if len(parts) != 2:
+        return None
+    start, end = _parse_date(parts[0], today), _parse_date(parts[1], today)
+    if start is None or end is None:
+        return None
+    if start[2] and end[2]:
+        total = (end[0] - start[0]) * 12 + (end[1] - start[1]) + 1
+    else:
+        total = (end[0] - start[0]) * 12
+    if total < 0:
+        return None
+    return divmod(total, 12)
+
+def _coerce_text(value):
+    if value is None or isinstance(value, str):
+        return value, None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value), None
+    return None, "must be a string"
+
+def _coerce_int(value):
+    if isinstance(value, bool):
+        return None, "must be an integer"
+    if isinstance(value, int):
+        return value, None
+    if isinstance(value, float) and value.is_integer():
+        return int(value), None
+    if isinstance(value, str):
+        match = _INT_RE.search(value)
+        if match:
+            return int(match.group(0)), None
+    if value is None:
+        return 0, None
+    return None, "must be an integer"
+
+def _validate_project(value, path, errors):
+    if isinstance(value, str):
+        return Project(Title=value, Description=None)
+    if not isinstance(value, dict):
+        errors.append((path, "must be an object with Title and Description"))
+        return None
+    fields = {}
+    for key in ("Title", "Description"):
+        fields[key], error = _coerce_text(value.get(key))
+        if error:
+            errors.append((f"{path}.{key}", error))
+    return Project(**fields)
+
+def _validate_experience(value, path, errors):
+    if not isinstance(value, dict):
+        errors.append((path, "must be an object"))
+        return None
+    fields = {}
+    for key in ("Designation", "Company", "Duration"):
+        fields[key], error = _coerce_text(value.get(key))
+        if error:
+            errors.append((f"{path}.{key}", error))
+    parsed = parse_duration(fields["Duration"])
+    if parsed is not None:
+        fields["Duration_years"], fields["Duration_months"] = parsed
+    else:
+        for key in ("Duration_years", "Duration_months"):
+            fields[key], error = _coerce_int(value.get(key))
+            if error:
+                errors.append((f"{path}.{key}", error))
+    projects = value.get("Projects")
+    if projects is None:
+        projects = []
+    if not isinstance(projects, list):
+        errors.append((f"{path}.Projects", "must be a list"))
+        projects = []
+    fields["Projects"] = [
+        project for project in (
+            _validate_project(item, f"{path}.Projects[{i}]", errors) for i, item in enumerate(projects)
+        ) if project is not None
+    ]
+    return WorkExperience(**fields)
+
+# Validate (and where it is unambiguous, coerce) an extracted resume dict.
+# Returns (Resume, errors): the Resume always has the full shape, with invalid
+# values replaced by null/empty, and errors lists (path, message) for exactly the
+# fields that were missing or malformed, e.g. ("work_experience[1].Company", ...).
+def validate_resume(data):
+    errors = []
+    if not isinstance(data, dict):
+        data = {}
+        errors.append(("", "must be a JSON object"))
+    fields = {}
+    for key in ("name", "email", "phone"):
+        if key not in data:
+            errors.append((key, "is missing"))
+        fields[key], error = _coerce_text(data.get(key))
+        if error:
+            errors.append((key, error))
+    if fields["email"] is not None and not EMAIL_RE.fullmatch(fields["email"].strip()):
+        errors.append(("email", "is not a valid email address"))
+        fields["email"] = None
+
+    skills = data.get("skills")
+    if "skills" not in data:
+        errors.append(("skills", "is missing"))
+    if isinstance(skills, str):
+        skills = [s.strip() for s in skills.split(",")]
+    if skills is None:
+        skills = []
+    if not isinstance(skills, list):
+        errors.append(("skills", "must be a list of strings"))
+        skills = []
+    fields["skills"] = [str(s).strip() for s in skills if isinstance(s, (str, int, float)) and str(s).strip()]
+
+    experiences = data.get("work_experience")
+    if "work_experience" not in data:
+        errors.append(("work_experience", "is missing"))
+    if experiences is None:
+        experiences = []
+    if not isinstance(experiences, list):
+        errors.append(("work_experience", "must be a list"))
+        experiences = []
+    fields["work_experience"] = [
+        exp for exp in (
+            _validate_experience(item, f"work_experience[{i}]", errors) for i, item in enumerate(experiences)
+        ) if exp is not None
+    ]
+    return Resume(**fields), errors
+
+# The unit a repair prompt re-generates for an error path: the top-level field,
+# or the whole work experience entry for anything nested inside one.
+def repair_target(path):
+    match = re.match(r"^(work_experience\[\d+\])", path)
+    return match.group(1) if match else path.split(".")[0].split("[")[0]
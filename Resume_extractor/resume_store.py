@@ -0,0 +1,515 @@
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import argparse
+from contextlib import contextmanager
+
+RESUMES_DB_PATH = "resumes.db"
+# Legacy store, imported once into the database by migrate_from_json
+RESUMES_JSON_PATH = "resumes.json"
+# Full-text search columns, in index order, and their BM25 weights: a hit in a
+# name or employer counts for more than one in a long project description
+SEARCH_COLUMNS = ("name", "company", "designation", "project", "description")
+SEARCH_WEIGHTS = (5.0, 3.0, 3.0, 2.0, 1.0)
+_SEARCH_TERM_RE = re.compile(r'(-?)(?:(\w+):)?(?:"([^"]*)"?|(\S+))')
+
+# Each save is a single INSERT in its own transaction, so concurrent sessions
+# (and the batch pipeline's worker threads) never lose each other's updates.
+@contextmanager
+def _connect(db_path):
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+def _normalize_email(email):
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+# "+91-98765 43210" and "9876543210" are the same phone: compare the last ten
+# digits (all of them for shorter numbers); fewer than seven digits is no phone
+def _normalize_phone(phone):
+    digits = re.sub(r"\D", "", phone) if isinstance(phone, str) else ""
+    return digits[-10:] if len(digits) >= 7 else None
+
+# "  Machine   learning" and "machine learning" index to the same skill
+def normalize_skill(skill):
+    return " ".join(skill.split()).casefold()
+
+def init_store(db_path=RESUMES_DB_PATH, json_path=RESUMES_JSON_PATH):
+    with _connect(db_path) as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS resumes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT,
+                email TEXT,
+                email_key TEXT,
+                phone TEXT,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                skills_text TEXT,
+                experience_months INTEGER
+            )
+        ''')
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_resumes_email_key ON resumes(email_key)")
+        _add_summary_columns(conn)
+        # Inverted skill index: the (skill_key, resume_id) primary key keeps each
+        # skill's posting list sorted by resume id, so AND/OR/NOT filters are
+        # index range scans combined with INTERSECT/UNION/EXCEPT.
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS skill_index (
+                skill_key TEXT NOT NULL,
+                resume_id INTEGER NOT NULL REFERENCES resumes(id),
+                PRIMARY KEY (skill_key, resume_id)
+            ) WITHOUT ROWID
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS skills (
+                skill_key TEXT PRIMARY KEY,
+                display_name TEXT NOT NULL,
+                resume_count INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        conn.execute("CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT)")
+        _add_search_index(conn)
+        _add_phone_key(conn)
+        # Stores created before the skill index had an exact-match resume_skills table
+        legacy = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'resume_skills'"
+        ).fetchone()
+        if legacy:
+            for resume_id, data in conn.execute("SELECT id, data FROM resumes").fetchall():
+                _index_skills(conn, resume_id, json.loads(data))
+            conn.execute("DROP TABLE resume_skills")
+    return migrate_from_json(db_path, json_path)
+
+# skills_text/experience_months are a precomputed projection for the summary
+# table, so listing resumes never has to parse the full JSON documents.
+def _summary_fields(resume):
+    if not isinstance(resume, dict):
+        return None, None
+    skills = [s for s in (resume.get('skills') or []) if isinstance(s, str)]
+    months = 0
+    for exp in resume.get('work_experience') or []:
+        if not isinstance(exp, dict):
+            continue
+        for key, scale in (('Duration_years', 12), ('Duration_months', 1)):
+            try:
+                months += int(exp.get(key) or 0) * scale
+            except (TypeError, ValueError):
+                pass
+    return ", ".join(skills), months
+
+def _add_summary_columns(conn):
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(resumes)")}
+    if "experience_months" in columns:
+        return
+    # Stores created before the summary projection existed
+    conn.execute("ALTER TABLE resumes ADD COLUMN skills_text TEXT")
+    conn.execute("ALTER TABLE resumes ADD COLUMN experience_months INTEGER")
+    rows = conn.execute("SELECT id, data FROM resumes").fetchall()
+    conn.executemany(
+        "UPDATE resumes SET skills_text = ?, experience_months = ? WHERE id = ?",
+        [(*_summary_fields(json.loads(data)), resume_id) for resume_id, data in rows],
+    )
+
+def _add_search_index(conn):
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'resume_search'"
+    ).fetchone()
+    if exists:
+        return
+    # FTS5 index of the free-text fields, one row per resume (rowid = resume
+    # id). Porter stemming makes "pipelines" find "pipeline".
+    conn.execute(f'''
+        CREATE VIRTUAL TABLE resume_search USING fts5(
+            {", ".join(SEARCH_COLUMNS)}, tokenize = 'porter unicode61 remove_diacritics 2'
+        )
+    ''')
+    conn.execute("INSERT INTO resume_search (resume_search, rank) VALUES ('rank', ?)",
+                 (f"bm25({', '.join(map(str, SEARCH_WEIGHTS))})",))
+    # Stores created before full-text search
+    for resume_id, data in conn.execute("SELECT id, data FROM resumes").fetchall():
+        _index_text(conn, resume_id, json.loads(data))
+
+def _add_phone_key(conn):
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(resumes)")}
+    if "phone_key" in columns:
+        return
+    # Stores created before saves were deduplicated: add the phone key, then
+    # merge records that already share an email or phone
+    conn.execute("ALTER TABLE resumes ADD COLUMN phone_key TEXT")
+    rows = conn.execute("SELECT id, phone FROM resumes").fetchall()
+    conn.executemany("UPDATE resumes SET phone_key = ? WHERE id = ?",
+                     [(_normalize_phone(phone), resume_id) for resume_id, phone in rows])
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_resumes_phone_key ON resumes(phone_key)")
+    _merge_duplicates(conn)
+
+# Keep one record per person: for every group of records sharing an email or
+# phone key, the oldest id survives with the newest data
+def _merge_duplicates(conn):
+    merged = 0
+    rows = conn.execute("SELECT id, email_key, phone_key FROM resumes ORDER BY id").fetchall()
+    keep = {}
+    for resume_id, email_key, phone_key in rows:
+        owner = keep.get(("email", email_key)) if email_key else None
+        owner = owner or (keep.get(("phone", phone_key)) if phone_key else None)
+        if owner is None:
+            owner = resume_id
+        else:
+            data = conn.execute("SELECT data FROM resumes WHERE id = ?", (resume_id,)).fetchone()[0]
+            _update_resume(conn, owner, json.loads(data))
+            _unindex_skills(conn, resume_id)
+            conn.execute("DELETE FROM resume_search WHERE rowid = ?", (resume_id,))
+            conn.execute("DELETE FROM resumes WHERE id = ?", (resume_id,))
+            merged += 1
+        if email_key:
+            keep.setdefault(("email", email_key), owner)
+        if phone_key:
+            keep.setdefault(("phone", phone_key), owner)
+    return merged
+
+def _index_skills(conn, resume_id, resume):
+    skills = {}
+    for skill in (resume.get('skills') or []) if isinstance(resume, dict) else []:
+        if isinstance(skill, str) and skill.strip():
+            skills.setdefault(normalize_skill(skill), skill.strip())
+    for skill_key, display_name in skills.items():
+        added = conn.execute(
+            "INSERT OR IGNORE INTO skill_index (skill_key, resume_id) VALUES (?, ?)", (skill_key, resume_id)
+        ).rowcount
+        conn.execute('''
+            INSERT INTO skills (skill_key, display_name, resume_count) VALUES (?, ?, ?)
+            ON CONFLICT(skill_key) DO UPDATE SET resume_count = resume_count + excluded.resume_count
+        ''', (skill_key, display_name, added))
+
+def _unindex_skills(conn, resume_id):
+    for (skill_key,) in conn.execute("SELECT skill_key FROM skill_index WHERE resume_id = ?", (resume_id,)).fetchall():
+        conn.execute("UPDATE skills SET resume_count = resume_count - 1 WHERE skill_key = ?", (skill_key,))
+    conn.execute("DELETE FROM skill_index WHERE resume_id = ?", (resume_id,))
+
+# Multi-valued fields (every employer, every project) are joined with newlines
+# into one column value each
+def _search_fields(resume):
+    fields = {column: [] for column in SEARCH_COLUMNS}
+    if not isinstance(resume, dict):
+        return {column: "" for column in SEARCH_COLUMNS}
+    fields["name"].append(resume.get('name'))
+    for exp in resume.get('work_experience') or []:
+        if not isinstance(exp, dict):
+            continue
+        fields["company"].append(exp.get('Company'))
+        fields["designation"].append(exp.get('Designation'))
+        for proj in exp.get('Projects') or []:
+            if isinstance(proj, dict):
+                fields["project"].append(proj.get('Title'))
+                fields["description"].append(proj.get('Description'))
+    return {column: "\n".join(v for v in values if isinstance(v, str) and v.strip())
+            for column, values in fields.items()}
+
+def _index_text(conn, resume_id, resume):
+    fields = _search_fields(resume)
+    conn.execute(
+        f"INSERT INTO resume_search (rowid, {', '.join(SEARCH_COLUMNS)}) "
+        f"VALUES (?, {', '.join('?' * len(SEARCH_COLUMNS))})",
+        (resume_id, *(fields[column] for column in SEARCH_COLUMNS)),
+    )
+
+def _insert_resume(conn, resume):
+    fields = resume if isinstance(resume, dict) else {}
+    skills_text, experience_months = _summary_fields(resume)
+    cursor = conn.execute('''
+        INSERT INTO resumes (name, email, email_key, phone, phone_key, data, created_at, skills_text,
+                             experience_months)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (
+        fields.get('name'),
+        fields.get('email'),
+        _normalize_email(fields.get('email')),
+        fields.get('phone'),
+        _normalize_phone(fields.get('phone')),
+        json.dumps(resume, ensure_ascii=False),
+        time.time(),
+        skills_text,
+        experience_months,
+    ))
+    resume_id = cursor.lastrowid
+    _index_skills(conn, resume_id, resume)
+    _index_text(conn, resume_id, resume)
+    return resume_id
+
+# Replace a record's data in place (same id), re-indexing its skills. Bumps
+# the update counter so store_version changes even though no id was added.
+def _update_resume(conn, resume_id, resume):
+    fields = resume if isinstance(resume, dict) else {}
+    skills_text, experience_months = _summary_fields(resume)
+    conn.execute('''
+        UPDATE resumes SET name = ?, email = ?, email_key = ?, phone = ?, phone_key = ?, data = ?,
+                           skills_text = ?, experience_months = ?
+        WHERE id = ?
+    ''', (
+        fields.get('name'),
+        fields.get('email'),
+        _normalize_email(fields.get('email')),
+        fields.get('phone'),
+        _normalize_phone(fields.get('phone')),
+        json.dumps(resume, ensure_ascii=False),
+        skills_text,
+        experience_months,
+        resume_id,
+    ))
+    _unindex_skills(conn, resume_id)
+    _index_skills(conn, resume_id, resume)
+    conn.execute("DELETE FROM resume_search WHERE rowid = ?", (resume_id,))
+    _index_text(conn, resume_id, resume)
+    conn.execute('''
+        INSERT INTO store_meta (key, value) VALUES ('updates', '1')
+        ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1
+    ''')
+
+# The saved record for the same person (same normalized email, else same
+# normalized phone), if any
+def _find_existing(conn, resume):
+    fields = resume if isinstance(resume, dict) else {}
+    for column, key in (("email_key", _normalize_email(fields.get('email'))),
+                        ("phone_key", _normalize_phone(fields.get('phone')))):
+        if key:
+            row = conn.execute(f"SELECT id FROM resumes WHERE {column} = ? ORDER BY id LIMIT 1", (key,)).fetchone()
+            if row is not None:
+                return row[0]
+    return None
+
+# Saves are deduplicated by person: a resume whose normalized email or phone
+# matches a saved record replaces that record's data (keeping its id) instead
+# of adding another entry. Returns the record's id.
+def _save(conn, resume):
+    existing = _find_existing(conn, resume)
+    if existing is not None:
+        _update_resume(conn, existing, resume)
+        return existing
+    return _insert_resume(conn, resume)
+
+def save_resume(resume, db_path=RESUMES_DB_PATH):
+    with _connect(db_path) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        return _save(conn, resume)
+
+# One-shot import of the legacy resumes.json. Runs inside a single transaction
+# and records itself in store_meta, so it is skipped on every later start.
+def migrate_from_json(db_path=RESUMES_DB_PATH, json_path=RESUMES_JSON_PATH):
+    with _connect(db_path) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        done = conn.execute("SELECT value FROM store_meta WHERE key = 'migrated_from_json'").fetchone()
+        if done is not None or not os.path.exists(json_path):
+            return 0
+        with open(json_path, "r", encoding="utf-8") as f:
+            try:
+                resumes = json.load(f)
+            except Exception:
+                resumes = []
+        for resume in resumes:
+            _save(conn, resume)
+        conn.execute(
+            "INSERT INTO store_meta (key, value) VALUES ('migrated_from_json', ?)",
+            (json.dumps({"path": os.path.abspath(json_path), "count": len(resumes), "at": time.time()}),),
+        )
+        return len(resumes)
+
+def _rows_to_resumes(rows):
+    return [json.loads(row[0]) for row in rows]
+
+def load_resumes(db_path=RESUMES_DB_PATH, resume_ids=None):
+    with _connect(db_path) as conn:
+        if resume_ids is None:
+            return _rows_to_resumes(conn.execute("SELECT data FROM resumes ORDER BY id"))
+        resumes = []
+        ids = list(resume_ids)
+        # Stay under SQLite's bound-parameter limit for large id lists
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            rows = conn.execute(f"SELECT id, data FROM resumes WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+            by_id = {row[0]: json.loads(row[1]) for row in rows}
+            resumes.extend(by_id[i] for i in chunk if i in by_id)
+        return resumes
+
+# Summary rows (id, name, email, skills, years of experience) for the given
+# resume ids, in the same order, without reading the full JSON documents.
+def load_summaries(resume_ids, db_path=RESUMES_DB_PATH):
+    summaries = []
+    ids = list(resume_ids)
+    with _connect(db_path) as conn:
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            rows = conn.execute(f'''
+                SELECT id, name, email, skills_text, experience_months FROM resumes
+                WHERE id IN ({','.join('?' * len(chunk))})
+            ''', chunk)
+            by_id = {
+                row[0]: {
+                    "id": row[0],
+                    "name": row[1],
+                    "email": row[2],
+                    "skills": row[3],
+                    "years_of_experience": round(row[4] / 12, 1) if row[4] is not None else None,
+                }
+                for row in rows
+            }
+            summaries.extend(by_id[i] for i in chunk if i in by_id)
+    return summaries
+
+def get_resume(resume_id, db_path=RESUMES_DB_PATH):
+    with _connect(db_path) as conn:
+        row = conn.execute("SELECT data FROM resumes WHERE id = ?", (resume_id,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+def find_by_email(email, db_path=RESUMES_DB_PATH):
+    with _connect(db_path) as conn:
+        rows = conn.execute(
+            "SELECT data FROM resumes WHERE email_key = ? ORDER BY id", (_normalize_email(email),)
+        )
+        return _rows_to_resumes(rows)
+
+def find_by_skill(skill, db_path=RESUMES_DB_PATH):
+    return load_resumes(db_path, query_skills(all_of=[skill], db_path=db_path))
+
+# All indexed skills as (skill_key, display_name, resume_count), most common first
+def list_skills(db_path=RESUMES_DB_PATH):
+    with _connect(db_path) as conn:
+        return conn.execute('''
+            SELECT skill_key, display_name, resume_count FROM skills
+            WHERE resume_count > 0 ORDER BY resume_count DESC, skill_key
+        ''').fetchall()
+
+# SQL selecting the resume ids that pass the skill filters, and its params
+def _skill_filter(all_of=(), any_of=(), none_of=()):
+    all_of = [normalize_skill(s) for s in all_of]
+    any_of = [normalize_skill(s) for s in any_of]
+    none_of = [normalize_skill(s) for s in none_of]
+    selects, params = [], []
+    for skill_key in all_of:
+        selects.append("SELECT resume_id FROM skill_index WHERE skill_key = ?")
+        params.append(skill_key)
+    if any_of:
+        selects.append(f"SELECT DISTINCT resume_id FROM skill_index WHERE skill_key IN ({','.join('?' * len(any_of))})")
+        params.extend(any_of)
+    sql = " INTERSECT ".join(selects) if selects else "SELECT id FROM resumes"
+    if none_of:
+        sql += f" EXCEPT SELECT resume_id FROM skill_index WHERE skill_key IN ({','.join('?' * len(none_of))})"
+        params.extend(none_of)
+    return sql, params
+
+# Resume ids (ascending) that have every skill in all_of, at least one skill in
+# any_of and none of the skills in none_of. Empty filters match everything.
+def query_skills(all_of=(), any_of=(), none_of=(), db_path=RESUMES_DB_PATH):
+    sql, params = _skill_filter(all_of, any_of, none_of)
+    with _connect(db_path) as conn:
+        return [row[0] for row in conn.execute(f"{sql} ORDER BY 1", params)]
+
+# Turn what was typed in the search box into an FTS5 query that is always
+# valid: every term is quoted, so "c++" or "node.js" search as plain words.
+# Supported: "exact phrases", prefix*, column:term (name, company,
+# designation, project, description) and -term to exclude. Terms are ANDed,
+# or ORed with match_all=False. None if nothing searchable is left.
+def _fts_query(text, match_all=True):
+    include, exclude = [], []
+    for negate, column, phrase, word in _SEARCH_TERM_RE.findall(text):
+        prefix = not phrase and word.endswith("*")
+        term = (phrase or word).rstrip("*").replace('"', "").strip()
+        if column and column.lower() not in SEARCH_COLUMNS:
+            # Not a column filter, just a word with a colon ("ex:genpact")
+            term, column = f"{column}:{term}", ""
+        if not re.search(r"\w", term):
+            continue
+        expression = f'"{term}"' + (" *" if prefix else "")
+        if column:
+            expression = f"{column.lower()} : {expression}"
+        (exclude if negate else include).append(expression)
+    if not include:
+        return None
+    query = " AND ".join(include) if match_all else f"({' OR '.join(include)})"
+    return query + "".join(f" NOT {expression}" for expression in exclude)
+
+def _search_where(query, all_of, any_of, none_of):
+    where, params = "resume_search MATCH ?", [query]
+    if all_of or any_of or none_of:
+        sql, skill_params = _skill_filter(all_of, any_of, none_of)
+        # +rowid keeps FTS5 from probing its index once per filtered id
+        # (seconds over 100k resumes); the filter is checked per match instead
+        where += f" AND +rowid IN ({sql})"
+        params.extend(skill_params)
+    return where, params
+
+# Number of resumes matching a full-text search (and the skill filters)
+def count_search_results(text, all_of=(), any_of=(), none_of=(), match_all=True, db_path=RESUMES_DB_PATH):
+    query = _fts_query(text, match_all)
+    if query is None:
+        return 0
+    where, params = _search_where(query, all_of, any_of, none_of)
+    with _connect(db_path) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM resume_search WHERE {where}", params).fetchone()[0]
+
+# One page of full-text search results over names, employers, designations and
+# projects, best BM25 match first: summary rows (see load_summaries) with a
+# "score" (higher is better) and a "snippet" of the best matching passage,
+# matched terms in **bold**. Snippets are only built for the rows on the page.
+# With match_all=False a resume needs only one of the terms; BM25 still ranks
+# resumes with more (and rarer) terms first.
+def search_resumes(text, limit=20, offset=0, all_of=(), any_of=(), none_of=(), match_all=True,
+                   db_path=RESUMES_DB_PATH):
+    query = _fts_query(text, match_all)
+    if query is None:
+        return []
+    where, params = _search_where(query, all_of, any_of, none_of)
+    with _connect(db_path) as conn:
+        ranked = conn.execute(
+            f"SELECT rowid, rank FROM resume_search WHERE {where} ORDER BY rank LIMIT ? OFFSET ?",
+            (*params, limit, offset),
+        ).fetchall()
+        if not ranked:
+            return []
+        ids = [resume_id for resume_id, _ in ranked]
+        snippets = dict(conn.execute(f'''
+            SELECT rowid, snippet(resume_search, -1, '**', '**', ' … ', 16) FROM resume_search
+            WHERE resume_search MATCH ? AND rowid IN ({','.join('?' * len(ids))})
+        ''', (query, *ids)))
+    scores = dict(ranked)
+    # Employers and projects are indexed one per line
+    snippets = {resume_id: snippet.replace("\n", " · ") for resume_id, snippet in snippets.items()}
+    return [
+        {**summary, "score": round(-scores[summary["id"]], 3), "snippet": snippets.get(summary["id"], "")}
+        for summary in load_summaries(ids, db_path)
+    ]
+
+def count_resumes(db_path=RESUMES_DB_PATH):
+    with _connect(db_path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM resumes").fetchone()[0]
+
+# Changes whenever a resume is saved (a new id or an in-place update); used as
+# a cache key by the UI so it only re-reads the store after a write. 0 means
+# the store is empty.
+def store_version(db_path=RESUMES_DB_PATH):
+    with _connect(db_path) as conn:
+        return conn.execute('''
+            SELECT CASE WHEN MAX(id) IS NULL THEN 0
+                        ELSE MAX(id) + COALESCE((SELECT CAST(value AS INTEGER) FROM store_meta
+                                                 WHERE key = 'updates'), 0) END
+            FROM resumes
+        ''').fetchone()[0]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Create the resume store and import resumes.json into it.")
+    parser.add_argument("--db", default=RESUMES_DB_PATH, help="SQLite resume store")
+    parser.add_argument("--json", default=RESUMES_JSON_PATH, help="Legacy resumes.json to import")
+    args = parser.parse_args(argv)
+    imported = init_store(args.db, args.json)
+    print(f"Imported {imported} resumes from {args.json}; store now holds {count_resumes(args.db)} resumes.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+import re
+from functools import lru_cache
+
+# Deterministic pre-extraction of the simple resume fields. Whatever is found
+# here is left out of the LLM prompt, which then only has to produce the
+# remaining fields (usually just work_experience).
+
+EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+PHONE_RE = re.compile(r"(?<![\w+(])[+(]?\d[\d\s().-]{8,18}\d(?!\w)")
+_NAME_TOKEN_RE = re.compile(r"^[A-Za-z][A-Za-z.'-]*$")
+# Title and section-header words that are never part of a name
+# ("Curriculum Vitae", "Professional Summary", "Contact Details")
+_HEADER_WORDS = {
+    "curriculum", "vitae", "resume", "cv", "biodata", "profile", "summary", "objective", "contact", "details",
+    "personal", "information", "professional", "experience", "education", "skills", "career", "page",
+}
+
+# Fewer vocabulary matches than this and the LLM is asked for skills too, so a
+# small or unrelated vocabulary never produces a near-empty skill list.
+MIN_RULE_SKILLS = 3
+
+def find_email(text):
+    match = EMAIL_RE.search(text)
+    return match.group(0) if match else None
+
+def find_phone(text):
+    for match in PHONE_RE.finditer(text):
+        groups = re.findall(r"\d+", match.group(0))
+        # Runs of years ("2019 - 2020 2021") look like phone numbers to the regex
+        if all(len(g) == 4 and g[:2] in ("19", "20") for g in groups):
+            continue
+        if 10 <= len("".join(groups)) <= 15:
+            return match.group(0).strip()
+    return None
+
+# Resumes almost always open with the candidate's name on a line of its own
+def find_name(text, max_lines=5):
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    for line in lines[:max_lines]:
+        tokens = line.split()
+        if 2 <= len(tokens) <= 4 and all(_NAME_TOKEN_RE.match(t) for t in tokens) \
+                and not any(t.strip(".").casefold() in _HEADER_WORDS for t in tokens):
+            return line
+    return None
+
+# One precompiled alternation for the whole vocabulary, longest skills first so
+# "Machine Learning" wins over "Learning". The lookarounds treat +, # and . as
+# part of a skill, so "C" does not match inside "C++" and "Java" not in "JavaScript".
+@lru_cache(maxsize=8)
+def skill_matcher(vocabulary):
+    skills = sorted({s.strip() for s in vocabulary if s and s.strip()}, key=len, reverse=True)
+    if not skills:
+        return None, {}
+    canonical = {s.casefold(): s for s in reversed(skills)}
+    pattern = r"(?<![\w+#.])(" + "|".join(re.escape(s) for s in skills) + r")(?![\w+#]|\.\w)"
+    return re.compile(pattern, re.IGNORECASE), canonical
+
+def find_skills(text, vocabulary):
+    matcher, canonical = skill_matcher(tuple(sorted(vocabulary)))
+    if matcher is None:
+        return []
+    found = {}
+    for match in matcher.finditer(text):
+        skill = canonical[match.group(1).casefold()]
+        found.setdefault(skill.casefold(), skill)
+    return list(found.values())
+
+# Fields that could be extracted without the LLM; missing fields are omitted
+def pre_extract(text, skill_vocabulary=()):
+    fields = {}
+    for field, finder in (("name", find_name), ("email", find_email), ("phone", find_phone)):
+        value = finder(text)
+        if value:
+            fields[field] = value
+    skills = find_skills(text, skill_vocabulary) if skill_vocabulary else []
+    if len(skills) >= MIN_RULE_SKILLS:
+        fields["skills"] = skills
+    return fields
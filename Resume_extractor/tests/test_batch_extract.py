@@ -0,0 +1,86 @@
+import time
+import importlib
+
+import fitz
+import pytest
+
+def _pdf(text):
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), text)
+    return doc.tobytes()
+
+# batch_extract with its caches and indexes in a temporary directory, and the
+# LLM replaced by a fake that records which cache key each text came with
+@pytest.fixture
+def batch(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("METRICS_PATH", str(tmp_path / "metrics.jsonl"))
+    batch_extract = importlib.import_module("batch_extract")
+    from near_duplicates import NearDuplicateIndex
+    monkeypatch.setattr(batch_extract, "near_duplicate_index", NearDuplicateIndex(str(tmp_path / "dupes.db")))
+    monkeypatch.setattr(batch_extract, "get_cached_extraction", lambda cache_key: None)
+    calls = []
+
+    def fake_extract(resume_text, cache_key=None, skill_vocabulary=(), on_field=None):
+        calls.append((cache_key, resume_text))
+        return {"name": resume_text.split()[0]}, resume_text
+
+    monkeypatch.setattr(batch_extract, "extract_resume_details", fake_extract)
+    return batch_extract, calls
+
+def test_same_file_name_keeps_results_and_cache_keys_apart(batch):
+    batch_extract, calls = batch
+    texts = {
+        "Alice": "Alice data engineer who built kafka streaming pipelines at Genpact for six years",
+        "Bob": "Bob frontend developer shipping react dashboards and design systems at TCS since 2019",
+    }
+    pdfs = {name: _pdf(text) for name, text in texts.items()}
+    results = list(batch_extract.extract_batch([("resume.pdf", pdfs["Alice"]), ("resume.pdf", pdfs["Bob"])],
+                                               concurrency=2, pdf_workers=1))
+
+    assert sorted(r["data"]["name"] for r in results) == ["Alice", "Bob"]
+    assert all(r["error"] is None and r["duplicate_of"] is None for r in results)
+    # Each text was extracted under its own PDF's cache key
+    keys = {cache_key: text.split()[0] for cache_key, text in calls}
+    assert keys == {batch_extract.extraction_cache_key(pdf): name for name, pdf in pdfs.items()}
+    # ...and indexed as its own near-duplicate document
+    assert len({r["doc_id"] for r in results}) == 2
+
+def test_failed_extraction_is_not_indexed(batch, monkeypatch):
+    batch_extract, calls = batch
+    text = "Carol backend developer building payment APIs in go and postgres at Razorpay for four years"
+    monkeypatch.setattr(batch_extract, "extract_resume_details",
+                        lambda resume_text, **kwargs: calls.append(resume_text) or (None, "not json"))
+    [failed] = batch_extract.extract_batch([("carol.pdf", _pdf(text))], pdf_workers=1, max_retries=0)
+    assert failed["error"] is not None and failed["doc_id"] is None
+    assert batch_extract.near_duplicate_index.stats()["documents"] == 0
+
+    # The same CV uploaded again is extracted, not matched against the failed one
+    [retried] = batch_extract.extract_batch([("carol.pdf", _pdf(text))], pdf_workers=1, max_retries=0)
+    assert retried["duplicate_of"] is None
+    assert len(calls) == 2
+
+def test_near_duplicate_in_the_same_batch_reuses_the_extraction(batch, monkeypatch):
+    batch_extract, calls = batch
+    text = "Dan data scientist training forecasting models with python and spark at Flipkart for five years"
+
+    def slow_extract(resume_text, **kwargs):
+        calls.append(resume_text)
+        time.sleep(1)
+        return {"name": "Dan"}, resume_text
+
+    monkeypatch.setattr(batch_extract, "extract_resume_details", slow_extract)
+    results = list(batch_extract.extract_batch([("dan.pdf", _pdf(text)), ("dan_v2.pdf", _pdf(text + " now"))],
+                                               concurrency=2, pdf_workers=1))
+    assert len(calls) == 1
+    [duplicate] = [r for r in results if r["duplicate_of"] is not None]
+    assert duplicate["source"] == "dan_v2.pdf" and duplicate["duplicate_of"] == "dan.pdf"
+    assert batch_extract.near_duplicate_index.stats()["duplicates_flagged"] == 1
+
+def test_find_alone_does_not_count_a_duplicate(tmp_path):
+    from near_duplicates import NearDuplicateIndex
+    index = NearDuplicateIndex(str(tmp_path / "dupes.db"))
+    text = "Erin product manager running growth experiments for a fintech app at Paytm since 2020"
+    index.add(text, "erin.pdf")
+    assert index.find(text) is not None
+    assert index.stats()["duplicates_flagged"] == 0
@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+import resume_extraction
+from common import tracing
+
+RESPONSE = json.dumps({"name": "Asha Rao", "email": "asha@example.com", "skills": ["Python"]})
+
+# LLM fake that streams its completion a few characters at a time and records
+# how far the caller read and whether it closed the stream
+class ChunkedLLM:
+    def __init__(self, completion, chunk_size=5):
+        self.chunks = [completion[i:i + chunk_size] for i in range(0, len(completion), chunk_size)]
+        self.sent = []
+        self.closed = False
+
+    def stream(self, prompt):
+        try:
+            for chunk in self.chunks:
+                self.sent.append(chunk)
+                yield chunk
+        finally:
+            self.closed = True
+
+@pytest.fixture
+def chunked_llm(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing, "METRICS_PATH", str(tmp_path / "metrics.jsonl"))
+    llm = ChunkedLLM(RESPONSE + ' and then {"name": "trailing tokens"} ' * 20)
+    monkeypatch.setattr(resume_extraction, "llm", llm)
+    return llm
+
+def test_stream_stops_once_the_object_closes(chunked_llm):
+    extracted, _ = resume_extraction._extract_single("resume text")
+    assert extracted == json.loads(RESPONSE)
+    assert chunked_llm.closed
+    assert "".join(chunked_llm.sent).startswith(RESPONSE)
+    assert len(chunked_llm.sent) < len(chunked_llm.chunks) // 2
+
+def test_fields_are_reported_while_streaming(chunked_llm):
+    seen = []
+    resume_extraction._extract_single("resume text", on_field=lambda key, value: seen.append((key, len(chunked_llm.sent))))
+    assert [key for key, _ in seen] == ["name", "email", "skills"]
+    # name was reported before the rest of the object had been streamed
+    assert seen[0][1] < seen[-1][1]
@@ -0,0 +1,10 @@
+from rule_extraction import find_name
+
+
+def test_find_name_skips_title_lines():
+    assert find_name("Curriculum Vitae\nAsha Rao\nasha.rao@example.com") == "Asha Rao"
+    assert find_name("PROFESSIONAL SUMMARY\nJohn Smith") == "John Smith"
+
+
+def test_find_name_gives_up_on_headers_only():
+    assert find_name("Curriculum Vitae\nContact Details") is None
@@ -0,0 +1,45 @@
+import os
+import sys
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.bench import add_bench_arguments, configure_llm, parse_levels, print_report, run_benchmark, write_json
+
+DEFAULT_QUESTIONS = "bench_questions.txt"
+
+def load_questions(path):
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+# Benchmark answer_question over a question set at several concurrency levels.
+# The query cache is not used, so every request plans its SQL from scratch.
+# Record completions once with --llm record, then benchmark offline with the
+# default --llm replay.
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark NL->SQL answering over a question set.")
+    parser.add_argument("--questions", default=DEFAULT_QUESTIONS, help="File with one question per line")
+    parser.add_argument("--db", default="social_media.db", help="SQLite database to query")
+    parser.add_argument("--mode", choices=["fast", "agent"], default="fast",
+                        help="fast: single-shot generation with agent escalation; agent: always run the agent")
+    add_bench_arguments(parser)
+    args = parser.parse_args(argv)
+
+    configure_llm(args)
+    # Imported only now, so the LLM is built with the settings above
+    from sql_agent import answer_question
+
+    def ask(question):
+        answer = answer_question(question, db_path=args.db, capture_verbose=False, fast=args.mode == "fast")
+        if answer.error:
+            raise RuntimeError(answer.error)
+
+    questions = load_questions(args.questions)
+    results = run_benchmark(ask, questions, parse_levels(args.concurrency), "nl_to_sql", args.repeat)
+    name = f"NL->SQL ({args.mode} mode, {len(questions)} questions x {args.repeat}, llm={args.llm})"
+    print_report(name, results)
+    if args.json_path:
+        write_json(args.json_path, name, args, results)
+    return 0 if all(r["errors"] == 0 for r in results) else 2
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,22 @@
+import time
+import random
 import sqlite3
+import argparse
+from array import array
+from contextlib import closing
 
-# Connect to SQLite database (creates social_media.db if it doesn't exist)
-conn = sqlite3.connect('social_media.db')
-cursor = conn.cursor()
+DB_PATH = 'social_media.db'
 
-# Create tables if they don't exist
-def init_db():
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS Users (
+# Bumped whenever the schema below changes; stored in PRAGMA user_version so
+# migrate_db knows whether an existing database needs upgrading
+SCHEMA_VERSION = 1
+
+# Dates are ISO-8601 text ('YYYY-MM-DD HH:MM:SS'), which sorts and range-scans
+# correctly in an index; the CHECK constraints keep every value in exactly that
+# form, so "post_date >= '2024-01-01'" can't miss rows written as '2024-1-5'.
+TABLES = {
+    "Users": '''
+        CREATE TABLE IF NOT EXISTS {name} (
             user_id INTEGER PRIMARY KEY,
             username TEXT NOT NULL,
             password TEXT NOT NULL,
@@ -15,30 +24,121 @@ def init_db():
             age INTEGER,
             gender TEXT
         )
-    ''')
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS Posts (
+    ''',
+    "Posts": '''
+        CREATE TABLE IF NOT EXISTS {name} (
             post_id INTEGER PRIMARY KEY,
             user_id INTEGER,
             content TEXT,
-            post_date TEXT,
+            post_date TEXT CHECK (post_date IS strftime('%Y-%m-%d %H:%M:%S', post_date)),
             FOREIGN KEY (user_id) REFERENCES Users(user_id)
         )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS Comments (
+    ''',
+    "Comments": '''
+        CREATE TABLE IF NOT EXISTS {name} (
             comment_id INTEGER PRIMARY KEY,
             post_id INTEGER,
             user_id INTEGER,
             comment TEXT,
-            comment_date TEXT,
+            comment_date TEXT CHECK (comment_date IS strftime('%Y-%m-%d %H:%M:%S', comment_date)),
             FOREIGN KEY (post_id) REFERENCES Posts(post_id),
             FOREIGN KEY (user_id) REFERENCES Users(user_id)
         )
-    ''')
-    
+    ''',
+}
+
+# Foreign keys lead each index so joins are index seeks, with the date second
+# so "posts by X in 2024" and per-user/per-post ordering are covered too
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_users_username ON Users(username)",
+    "CREATE INDEX IF NOT EXISTS idx_posts_user_date ON Posts(user_id, post_date)",
+    "CREATE INDEX IF NOT EXISTS idx_posts_date ON Posts(post_date)",
+    "CREATE INDEX IF NOT EXISTS idx_posts_year ON Posts(strftime('%Y', post_date))",
+    "CREATE INDEX IF NOT EXISTS idx_comments_post_date ON Comments(post_id, comment_date)",
+    "CREATE INDEX IF NOT EXISTS idx_comments_user_date ON Comments(user_id, comment_date)",
+    "CREATE INDEX IF NOT EXISTS idx_comments_date ON Comments(comment_date)",
+]
+
+# Column lists used when a legacy table is copied into the current schema
+_COLUMNS = {
+    "Posts": ("post_id", "user_id", "content", "post_date"),
+    "Comments": ("comment_id", "post_id", "user_id", "comment", "comment_date"),
+}
+_DATE_COLUMNS = {"Posts": "post_date", "Comments": "comment_date"}
+
+# Create tables if they don't exist
+def create_tables(cursor):
+    for name, sql in TABLES.items():
+        cursor.execute(sql.format(name=name))
+
+# Indexes, planner statistics and the schema version. Run after bulk loads, so
+# rows aren't inserted into indexes one at a time.
+def finish_schema(conn):
+    for sql in INDEXES:
+        conn.execute(sql)
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.commit()
+
+# Copy a legacy table into the current definition (SQLite can't add a CHECK
+# constraint in place), normalizing its dates on the way
+def _rebuild_table(conn, table, log):
+    column = _DATE_COLUMNS[table]
+    columns = _COLUMNS[table]
+    conn.execute(TABLES[table].format(name=f"{table}_new"))
+    select = ", ".join(f"strftime('%Y-%m-%d %H:%M:%S', {c})" if c == column else c for c in columns)
+    conn.execute(f"INSERT INTO {table}_new ({', '.join(columns)}) SELECT {select} FROM {table}")
+    unparseable = conn.execute(
+        f"SELECT count(*) FROM {table} WHERE {column} IS NOT NULL AND strftime('%Y-%m-%d %H:%M:%S', {column}) IS NULL"
+    ).fetchone()[0]
+    if unparseable:
+        log(f"{table}: {unparseable} unparseable {column} values were set to NULL")
+    conn.execute(f"DROP TABLE {table}")
+    conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+
+# Bring an existing database up to SCHEMA_VERSION: rebuild Posts/Comments with
+# canonical dates, add the indexes and run ANALYZE. Returns True if anything
+# was migrated; a database that is already current is left untouched.
+def migrate_db(db_path=DB_PATH, log=print):
+    with closing(sqlite3.connect(db_path, isolation_level=None)) as conn:
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            return False
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            existing = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            for table in _DATE_COLUMNS:
+                if table in existing:
+                    _rebuild_table(conn, table, log)
+            create_tables(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finish_schema(conn)
+        if existing:
+            log(f"Migrated {db_path} to schema version {SCHEMA_VERSION}")
+        return True
+
+# Bulk-load settings for a database that is being (re)built: the whole load is
+# one transaction, so a crash just means re-running the script
+def _bulk_load_pragmas(conn):
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA cache_size=-262144")
+    conn.execute("PRAGMA temp_store=MEMORY")
+
+# Sample data; every insert runs in a single transaction via executemany
+def init_db(db_path=DB_PATH):
+    migrate_db(db_path)
+    with closing(sqlite3.connect(db_path)) as conn:
+        _bulk_load_pragmas(conn)
+        with conn:
+            _insert_sample_data(conn.cursor())
+        finish_schema(conn)
+
+def _insert_sample_data(cursor):
+    create_tables(cursor)
+
     # Check if tables already have data
     cursor.execute("SELECT COUNT(*) FROM Users")
     if cursor.fetchone()[0] == 0:
@@ -79,15 +179,14 @@ def init_db():
 ]
 
         
-        for username, password, gmail, age, gender in sample_users:
-            cursor.execute('''
-                INSERT INTO Users (username, password, gmail, age, gender)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (username, password, gmail, age, gender))
-    
-    # Get all user IDs
-    cursor.execute("SELECT user_id FROM Users")
-    user_ids = [row[0] for row in cursor.fetchall()]
+        cursor.executemany('''
+            INSERT INTO Users (username, password, gmail, age, gender)
+            VALUES (?, ?, ?, ?, ?)
+        ''', sample_users)
+
+    # username -> user_id, so posts and comments don't look each user up
+    cursor.execute("SELECT username, user_id FROM Users")
+    user_ids = dict(cursor.fetchall())
     
     cursor.execute("SELECT COUNT(*) FROM Posts")
     if cursor.fetchone()[0] == 0:
@@ -199,19 +298,10 @@ def init_db():
 ]
 
         
-        for username, content, post_date in sample_posts:
-            cursor.execute('''
-                SELECT user_id FROM Users WHERE username = ?
-            ''', (username,))
-            user_id = cursor.fetchone()[0]
-            cursor.execute('''
-                INSERT INTO Posts (user_id, content, post_date)
-                VALUES (?, ?, ?)
-            ''', (user_id, content, post_date))
-    
-    # Get all post IDs
-    cursor.execute("SELECT post_id FROM Posts")
-    post_ids = [row[0] for row in cursor.fetchall()]
+        cursor.executemany('''
+            INSERT INTO Posts (user_id, content, post_date)
+            VALUES (?, ?, ?)
+        ''', [(user_ids[username], content, post_date) for username, content, post_date in sample_posts])
     
     cursor.execute("SELECT COUNT(*) FROM Comments")
     if cursor.fetchone()[0] == 0:
@@ -275,19 +365,167 @@ def init_db():
 ]
 
         
-        for username, post_id, comment, comment_date in sample_comments:
-            cursor.execute('''
-                SELECT user_id FROM Users WHERE username = ?
-            ''', (username,))
-            user_id = cursor.fetchone()[0]
-            cursor.execute('''
-                INSERT INTO Comments (post_id, user_id, comment, comment_date)
-                VALUES (?, ?, ?, ?)
-            ''', (post_id, user_id, comment, comment_date))
-    
-    conn.commit()
+        cursor.executemany('''
+            INSERT INTO Comments (post_id, user_id, comment, comment_date)
+            VALUES (?, ?, ?, ?)
+        ''', [(post_id, user_ids[username], comment, comment_date)
+              for username, post_id, comment, comment_date in sample_comments])
+
+# --- Synthetic load-test data ---
+# Seeded, so the same arguments always build the same database.
+
+_FIRST_NAMES = [
+    "john", "alejandro", "giulia", "arjun", "priya", "mohammad", "emily", "rahul", "zainab", "marco",
+    "isabella", "krishna", "sarah", "yusuf", "manpreet", "daniel", "ananya", "rohit", "lucia", "fatima",
+    "anthony", "vignesh", "rajat", "maria", "ahmed", "olivia", "deepika", "sanjay", "juan", "samira",
+]
+_LAST_NAMES = [
+    "doe", "fernandez", "rossi", "menon", "sharma", "ali", "clark", "verma", "khan", "bianchi",
+    "martinez", "iyer", "jones", "siddiqui", "kaur", "smith", "reddy", "pandey", "gomez", "sheikh",
+    "white", "warrior", "aggarwal", "lombardi", "hassan", "brown", "nair", "patel", "ramirez", "khatun",
+]
+_MAIL_DOMAINS = ["gmail.com", "yahoo.com", "outlook.com", "hotmail.com", "rediffmail.com"]
+_POST_OPENERS = [
+    "Started learning", "Just finished a course on", "Attended a webinar on", "Excited about",
+    "Working on a project about", "Reading up on", "Spent the weekend on", "Volunteered for",
+    "Preparing for my exam on", "Sharing some thoughts on",
+]
+_POST_TOPICS = [
+    "Python programming", "data science", "cloud computing", "sustainable fashion", "European politics",
+    "machine learning", "digital marketing", "basketball", "cricket", "football", "photography", "yoga",
+    "cybersecurity", "JavaScript frameworks", "project management", "early childhood education",
+    "environmental policy", "DevOps", "AI in healthcare", "street style",
+]
+_POST_CLOSERS = [
+    "Excited to upskill!", "Great experience overall.", "Highly recommend it.", "Lots to learn still.",
+    "Amazing atmosphere!", "Important times ahead.", "", "Any tips?",
+]
+_COMMENTS = [
+    "Great insights, thanks for sharing!", "Totally agree with this!", "Thanks for sharing!", "Good job!",
+    "Very informative.", "Love this post!", "Interesting perspective.", "Looking forward to more posts.",
+    "Could be better explained, but nice effort.", "I disagree with some points.",
+]
+_NEGATIVE_COMMENTS = ["Not helpful at all.", "Terrible advice, don’t follow this.", "Thats so lame!"]
+_SPAM_COMMENTS = ["Want instant money?? - click here www.instantmoney.com", "www.clickme.com.", "Spam comment here! Ignore this!"]
+
+def _timestamp(text):
+    return int(time.mktime(time.strptime(text, "%Y-%m-%d")))
+
+def _format_time(ts):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts))
+
+# A date in [start, end]; date_skew 0 is uniform, larger values crowd dates
+# towards the end of the range (a growing platform)
+def _random_time(rng, start, end, date_skew):
+    return start + int((end - start) * rng.random() ** (1.0 / (1.0 + date_skew)))
+
+# Active users post and comment far more than the rest: user ids are drawn with
+# density falling off as activity_skew grows (1.0 = uniform)
+def _random_user(rng, users, activity_skew):
+    return int(users * rng.random() ** activity_skew) + 1
+
+def _synthetic_users(rng, users, female_ratio):
+    for user_id in range(1, users + 1):
+        username = f"{rng.choice(_FIRST_NAMES)}_{rng.choice(_LAST_NAMES)}{user_id}"
+        gender = "F" if rng.random() < female_ratio else "M"
+        age = int(rng.triangular(16, 70, 27))
+        yield (user_id, username, f"pw{rng.getrandbits(40):010x}", f"{username}@{rng.choice(_MAIL_DOMAINS)}", age, gender)
+
+def _synthetic_posts(rng, posts, users, start, end, date_skew, activity_skew, post_times):
+    for post_id in range(1, posts + 1):
+        posted = _random_time(rng, start, end, date_skew)
+        post_times.append(posted)
+        content = f"{rng.choice(_POST_OPENERS)} {rng.choice(_POST_TOPICS)}. {rng.choice(_POST_CLOSERS)}".strip()
+        yield (post_id, _random_user(rng, users, activity_skew), content, _format_time(posted))
+
+# Comments land on random posts, a few hours to days after the post was made
+def _synthetic_comments(rng, comments, users, post_times, end, activity_skew, spam_ratio, negative_ratio,
+                        mean_delay_hours=36):
+    posts = len(post_times)
+    for comment_id in range(1, comments + 1):
+        post_id = rng.randrange(posts) + 1
+        commented = min(end, post_times[post_id - 1] + int(rng.expovariate(1.0 / (mean_delay_hours * 3600))))
+        roll = rng.random()
+        if roll < spam_ratio:
+            text = rng.choice(_SPAM_COMMENTS)
+        elif roll < spam_ratio + negative_ratio:
+            text = rng.choice(_NEGATIVE_COMMENTS)
+        else:
+            text = rng.choice(_COMMENTS)
+        yield (comment_id, post_id, _random_user(rng, users, activity_skew), text, _format_time(commented))
+
+# Build a fresh load-test database of the given size. Rows are streamed from
+# generators into executemany inside a single transaction, so memory stays
+# flat apart from the post timestamps (8 bytes per post) used to date comments.
+def generate_synthetic_db(db_path, users=100000, posts=1000000, comments=2000000, seed=42,
+                          date_start="2020-01-01", date_end="2025-06-30", date_skew=1.0,
+                          activity_skew=2.0, female_ratio=0.5, spam_ratio=0.03, negative_ratio=0.07,
+                          log=print):
+    rng = random.Random(seed)
+    start, end = _timestamp(date_start), _timestamp(date_end) + 86399
+    post_times = array("q")
+    with closing(sqlite3.connect(db_path)) as conn:
+        _bulk_load_pragmas(conn)
+        with conn:
+            cursor = conn.cursor()
+            for table in ("Comments", "Posts", "Users"):
+                cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            create_tables(cursor)
+            began = time.perf_counter()
+            cursor.executemany(
+                "INSERT INTO Users (user_id, username, password, gmail, age, gender) VALUES (?, ?, ?, ?, ?, ?)",
+                _synthetic_users(rng, users, female_ratio),
+            )
+            log(f"Users: {users:,} rows in {time.perf_counter() - began:.1f}s")
+            began = time.perf_counter()
+            cursor.executemany(
+                "INSERT INTO Posts (post_id, user_id, content, post_date) VALUES (?, ?, ?, ?)",
+                _synthetic_posts(rng, posts, users, start, end, date_skew, activity_skew, post_times),
+            )
+            log(f"Posts: {posts:,} rows in {time.perf_counter() - began:.1f}s")
+            began = time.perf_counter()
+            if posts:
+                cursor.executemany(
+                    "INSERT INTO Comments (comment_id, post_id, user_id, comment, comment_date) VALUES (?, ?, ?, ?, ?)",
+                    _synthetic_comments(rng, comments, users, post_times, end, activity_skew, spam_ratio, negative_ratio),
+                )
+            log(f"Comments: {comments if posts else 0:,} rows in {time.perf_counter() - began:.1f}s")
+        began = time.perf_counter()
+        finish_schema(conn)
+        log(f"Indexes and ANALYZE in {time.perf_counter() - began:.1f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Create social_media.db with sample data, or build a synthetic load-test database.")
+    parser.add_argument("--db", default=DB_PATH, help="Database file to create")
+    parser.add_argument("--synthetic", action="store_true", help="Replace all tables with seeded synthetic data")
+    parser.add_argument("--migrate", action="store_true", help="Only upgrade an existing database (typed dates, indexes, ANALYZE)")
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--posts", type=int, default=1000000)
+    parser.add_argument("--comments", type=int, default=2000000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--date-start", default="2020-01-01", help="Earliest post date (YYYY-MM-DD)")
+    parser.add_argument("--date-end", default="2025-06-30", help="Latest post/comment date (YYYY-MM-DD)")
+    parser.add_argument("--date-skew", type=float, default=1.0, help="0 = uniform dates; higher = more recent activity")
+    parser.add_argument("--activity-skew", type=float, default=2.0, help="1 = every user equally active; higher = fewer, heavier posters")
+    parser.add_argument("--female-ratio", type=float, default=0.5)
+    parser.add_argument("--spam-ratio", type=float, default=0.03)
+    parser.add_argument("--negative-ratio", type=float, default=0.07)
+    args = parser.parse_args()
+
+    if args.migrate:
+        if not migrate_db(args.db):
+            print(f"{args.db} is already at schema version {SCHEMA_VERSION}")
+        return
+    if not args.synthetic:
+        init_db(args.db)
+        print("Database and tables created successfully!")
+        return
+    began = time.perf_counter()
+    generate_synthetic_db(
+        args.db, args.users, args.posts, args.comments, args.seed, args.date_start, args.date_end,
+        args.date_skew, args.activity_skew, args.female_ratio, args.spam_ratio, args.negative_ratio,
+    )
+    print(f"Synthetic database {args.db} created in {time.perf_counter() - began:.1f}s")
 
 if __name__ == "__main__":
-    init_db()
-    print("Database and tables created successfully!")
-    conn.close()
\ No newline at end of file
+    main()
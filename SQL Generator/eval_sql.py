@@ -0,0 +1,151 @@
+import os
+import sys
+import json
+import time
+import argparse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.bench import add_llm_arguments, configure_llm
+from sql_executor import get_pool
+
+DEFAULT_GOLDEN_SET = "golden_set.jsonl"
+DEFAULT_CONCURRENCY = 4
+# Mode name -> answer_question(fast=...)
+MODES = {"fast": True, "agent": False}
+
+# One {"id", "question", "sql"} object per line; sql is the reference query
+def load_golden_set(path):
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if line.strip() and not line.startswith("#"):
+                entry = json.loads(line)
+                entry.setdefault("id", str(number))
+                entries.append(entry)
+    return entries
+
+def _normalize(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return round(float(value), 6)
+    if isinstance(value, bytes):
+        return value.hex()
+    return value
+
+def _row_key(row):
+    return tuple(sorted((_normalize(v) for v in row), key=repr))
+
+# Execution-based scoring: both queries must return the same rows the same
+# number of times (an order-insensitive multiset). Column names and column
+# order are ignored, and numbers compare by value (3 == 3.0).
+def results_match(expected_rows, actual_rows):
+    return Counter(map(_row_key, expected_rows)) == Counter(map(_row_key, actual_rows))
+
+def evaluate_question(answer_question, entry, reference_rows, fast, db_path):
+    start = time.perf_counter()
+    try:
+        answer = answer_question(entry["question"], db_path=db_path, capture_verbose=False, fast=fast)
+    except Exception as e:
+        return {"id": entry["id"], "match": False, "sql": None, "source": None, "error": f"{type(e).__name__}: {e}",
+                "seconds": time.perf_counter() - start, "llm_calls": 0, "tokens_in": 0, "tokens_out": 0}
+    seconds = time.perf_counter() - start
+    error = answer.error
+    match = False
+    if answer.sql is None and error is None:
+        error = "No SQL was generated."
+    elif error is None:
+        try:
+            _, rows = get_pool(db_path).execute(answer.sql)
+            match = results_match(reference_rows, rows)
+        except Exception as e:
+            error = str(e)
+    return {
+        "id": entry["id"],
+        "match": match,
+        "sql": answer.sql,
+        "source": answer.source,
+        "error": error,
+        "seconds": seconds,
+        "llm_calls": answer.counters.get("llm_calls", 0),
+        "tokens_in": answer.counters.get("tokens_in", 0),
+        "tokens_out": answer.counters.get("tokens_out", 0),
+    }
+
+def summarize_mode(mode, results):
+    seconds = [r["seconds"] for r in results]
+    return {
+        "mode": mode,
+        "questions": len(results),
+        "accuracy": sum(r["match"] for r in results) / len(results),
+        "errors": sum(1 for r in results if r["error"]),
+        "p50": float(np.percentile(seconds, 50)),
+        "p95": float(np.percentile(seconds, 95)),
+        "mean_seconds": float(np.mean(seconds)),
+        "llm_calls": float(np.mean([r["llm_calls"] for r in results])),
+        "tokens_in": float(np.mean([r["tokens_in"] for r in results])),
+        "tokens_out": float(np.mean([r["tokens_out"] for r in results])),
+        "sources": dict(Counter(r["source"] or "none" for r in results)),
+    }
+
+# Generate SQL for every golden question (in parallel, without the query
+# cache) in each mode and score it by executing it against the database.
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score NL->SQL generation against a golden question set.")
+    parser.add_argument("--golden", default=DEFAULT_GOLDEN_SET, help="JSONL file of {id, question, sql}")
+    parser.add_argument("--db", default="social_media.db", help="SQLite database to run the queries on")
+    parser.add_argument("--modes", default="fast,agent", help="Comma-separated modes to compare (fast, agent)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Questions evaluated at once")
+    parser.add_argument("--verbose", action="store_true", help="Print every question's result")
+    parser.add_argument("--json", dest="json_path", help="Also write the per-question results to this JSON file")
+    add_llm_arguments(parser)
+    args = parser.parse_args(argv)
+
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown:
+        parser.error(f"unknown mode(s): {', '.join(unknown)}")
+
+    configure_llm(args)
+    # Imported only now, so the LLM is built with the settings above
+    from sql_agent import answer_question
+
+    entries = load_golden_set(args.golden)
+    pool = get_pool(args.db)
+    references = {}
+    for entry in entries:
+        _, references[entry["id"]] = pool.execute(entry["sql"])
+
+    report = {"golden_set": args.golden, "modes": {}}
+    for mode in modes:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            results = list(executor.map(
+                lambda entry: evaluate_question(answer_question, entry, references[entry["id"]], MODES[mode],
+                                                args.db),
+                entries,
+            ))
+        summary = summarize_mode(mode, results)
+        report["modes"][mode] = {"summary": summary, "results": results}
+        if args.verbose:
+            for r in results:
+                status = "ok  " if r["match"] else "FAIL"
+                print(f"[{mode}] {status} {r['id']} ({r['source']}, {r['seconds']:.2f}s)"
+                      + (f": {r['error']}" if r["error"] else ""))
+
+    print(f"\n{len(entries)} golden questions from {args.golden}")
+    print(f"{'mode':<6} {'accuracy':>8} {'errors':>6} {'p50 s':>7} {'p95 s':>7} {'calls':>6} {'tok in':>7} "
+          f"{'tok out':>7}  sources")
+    for mode in modes:
+        s = report["modes"][mode]["summary"]
+        sources = ", ".join(f"{name} {n}" for name, n in sorted(s["sources"].items()))
+        print(f"{mode:<6} {s['accuracy']:>8.1%} {s['errors']:>6} {s['p50']:>7.2f} {s['p95']:>7.2f} "
+              f"{s['llm_calls']:>6.2f} {s['tokens_in']:>7.0f} {s['tokens_out']:>7.0f}  {sources}")
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
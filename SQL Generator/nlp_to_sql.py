@@ -1,147 +1,48 @@
 import streamlit as st
 import os
-import sqlite3
-import pandas as pd
-from langchain_together import Together
-from langchain_community.utilities import SQLDatabase
-from langchain_community.agent_toolkits.sql.toolkit import SQLDatabaseToolkit
-from langchain.prompts import PromptTemplate
-from langchain.agents import initialize_agent
-from langchain.agents.agent_types import AgentType
-from langchain.schema import OutputParserException
-from langchain.tools import Tool
+import sys
+import time
+from sql_agent import DB_PATH
+from sql_executor import get_pool
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.jobs import JobQueue
+from common.tracing import render_diagnostics
 
-os.environ["TOGETHER_API_KEY"] = "YOUR API KEY"
-
-# Initialize LLM
-llm = Together(
-    model="meta-llama/Llama-4-Scout-17B-16E-Instruct",
-    max_tokens=512,
-    temperature=0.7
-)
-
-DB_PATH = "social_media.db"
-db = SQLDatabase.from_uri(f"sqlite:///{DB_PATH}")
-
-INSTRUCTION_PROMPT = """
-You are an intelligent assistant that translates natural language into correct SQL queries.
-- Always use correct SQL syntax.
-- Use only the provided tables and columns.
-- Do not use any table or column that is not listed in the schema.
-- If the user refers to something not in the schema, ignore it.
-- Only use the tables: Users, Posts, Comments.
-- Return ONLY the SQL query, nothing else.
-- Do not explain or add commentary.
-- Do NOT use code blocks or markdown formatting. Output only plain SQL.
-
-NOTE : Give the SQL Query directly without any special characters like '```' and avoid duplicate queries
-
-Go through user question carefully and generate the correct SQL query.
-
-Schema:
-{schema}
-
-User Question: {input}
-SQL Query:
-"""
-
-prompt_template = PromptTemplate(
-    input_variables=["schema", "input"],
-    template=INSTRUCTION_PROMPT
-)
-
-def elaborate_user_query(nl_query: str) -> str:
-    prompt = f"""
-You are a helpful assistant who clarifies vague or subjective natural language database queries.
-
-Given the query:
-"{nl_query}"
-
-1. Identify and explain any ambiguous or subjective terms (e.g., "popular", "negative", "recent").
-2. Suggest how they could be interpreted in terms of the schema (Users, Posts, Comments).
-3. Rephrase the query in a more precise way to help an LLM generate SQL.
-
-Response:
-"""
-    return llm.predict(prompt).strip()
-
-query_explainer_tool = Tool(
-    name="QueryExplainer",
-    func=elaborate_user_query,
-    description=(
-        """Use this tool when the user's question is vague, emotional, or subjective. 
-        This tool helps clarify terms like 'negative', 'frequent', 'popular', etc. 
-        Input should be the raw user question. The tool explains how to interpret the query clearly. Also provide with diverse examples to make the subjective query as clear as possible"""
-    ),
-)
-
-import io
-import contextlib
-
-def run_agent(query, max_retries=2, capture_verbose=False):
-    schema = db.get_table_info()
-    toolkit = SQLDatabaseToolkit(db=db, llm=llm)
-    tools = toolkit.get_tools()
-    tools.append(query_explainer_tool)
-
-    agent = initialize_agent(
-        agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
-        tools=tools,
-        llm=llm,
-        verbose=True if capture_verbose else False,
-        handle_parsing_errors=True,
-        agent_kwargs={
-            "prefix": prompt_template.template.format(schema=schema, input="{input}")
-        }
-    )
+# Must be the first Streamlit call of the script, before get_job_queue below
+st.set_page_config(page_title="Social Media DB Query", layout="wide")
 
-    retries = 0
-    logs = ""
-    while retries < max_retries:
+PAGE_SIZES = [25, 50, 100, 500]
+# Worker processes answering questions, shared by every session
+JOB_WORKERS = 4
+JOB_POLL_SECONDS = 1.0
+
+# One queue and worker pool per server process. Questions are answered in the
+# workers (each with its own agent and query cache connection), so a slow LLM
+# call never blocks a session's script run.
+@st.cache_resource
+def get_job_queue():
+    queue = JobQueue()
+    queue.start_workers({"nl_to_sql": "sql_agent:answer_job"}, processes=JOB_WORKERS)
+    return queue
+
+job_queue = get_job_queue()
+poll_job = False
+
+# Result kept in session_state under `name` until `key` changes, so reruns
+# (widget changes, job polling) don't run the query again. Returns
+# (value, error message).
+def session_cached(name, key, compute):
+    cached = st.session_state.get(name)
+    if cached is None or cached[0] != key:
         try:
-            if capture_verbose:
-                buf = io.StringIO()
-                with contextlib.redirect_stdout(buf):
-                    result = agent.run(query)
-                logs = buf.getvalue()
-                return result, logs
-            else:
-                return agent.run(query), None
-        except OutputParserException:
-            retries += 1
-    raise Exception("Failed to parse LLM output after retries.")
-
-def fallback_llm(query):
-    schema = db.get_table_info()
-    prompt_text = prompt_template.format(schema=schema, input=query)
-    raw_output = llm.predict(prompt_text)
-    sql = raw_output.strip()
-    if sql.startswith("```sql"):
-        sql = sql.replace("```sql", "").replace("```", "").strip()
-    sql = sql.split(";")[0].strip()
-    return sql
-
-def execute_sql(sql):
-    if not sql.lower().startswith("select"):
-        return None, "LLM output does not appear to be a valid SELECT SQL query."
-    try:
-        with sqlite3.connect(DB_PATH) as conn:
-            df = pd.read_sql_query(sql, conn)
-        return df, None
-    except Exception as e:
-        return None, str(e)
-
-def test_sql_execute_query(query):
-    try:
-        with sqlite3.connect(DB_PATH) as conn:
-            df = pd.read_sql_query(query, conn)
-        return df
-    except Exception as e:
-        return None
+            cached = (key, compute(), None)
+        except Exception as e:
+            cached = (key, None, str(e))
+        st.session_state[name] = cached
+    return cached[1], cached[2]
 
 # --- Streamlit UI ---
-st.set_page_config(page_title="Social Media DB Query", layout="wide")
 st.markdown(
     """
     <h1 style='text-align: center; color: #4CAF50; font-size: 50px;'>
@@ -152,6 +53,10 @@ st.markdown(
 )
 tabs = st.tabs(["nlp_to_sql", "test_sql"])
 
+# Latency percentiles per stage and LLM/cache counters from metrics.jsonl
+with st.sidebar.expander("Diagnostics"):
+    render_diagnostics(st, kind="nl_to_sql")
+
 # --- NLP to SQL Tab ---
 with tabs[0]:
     st.title("Natural Language Queries to SQL")
@@ -173,31 +78,57 @@ with tabs[0]:
         st.session_state['agent_logs'] = ''
 
     query = st.text_area("Your question:", st.session_state['query'], height=120)
+    fast_mode = st.checkbox("Fast mode", value=True, help="Generate the SQL in a single LLM call, validated locally against the database; the full agent only runs if that SQL doesn't compile.")
     submit = st.button("Submit")
 
     if submit and query.strip():
-        with st.spinner("Processing your query..."):
-            sql = None
-            df = None
-            logs = ""
-            try:
-                result, logs = run_agent(query, capture_verbose=True)
-                if isinstance(result, (pd.DataFrame, dict, list)):
-                    df = pd.DataFrame(result) if not isinstance(result, pd.DataFrame) else result
-                else:
-                    sql = str(result).strip()
-                    if sql.lower().startswith("select"):
-                        df, _ = execute_sql(sql)
-            except Exception:
-                sql = fallback_llm(query)
-                df, _ = execute_sql(sql)
-                logs = "(No agent logs available for fallback LLM mode.)"
-            st.session_state['query'] = query
-            st.session_state['sql'] = sql if sql else fallback_llm(query)
-            st.session_state['df'] = df
-            st.session_state['agent_logs'] = logs
+        st.session_state['query'] = query
+        st.session_state['df'] = st.session_state['answer'] = st.session_state['job_error'] = None
+        st.session_state['sql'] = st.session_state['agent_logs'] = ''
+        st.session_state['job_id'] = job_queue.submit("nl_to_sql", {"question": query, "fast": fast_mode})
+        st.query_params["job"] = st.session_state['job_id']
+
+    # The job ID is also kept in the URL, so a reconnecting browser picks up
+    # the result of a question it asked before
+    job_id = st.session_state.get('job_id') or st.query_params.get("job")
+    if job_id and st.session_state.get('answered_job') != job_id:
+        job = job_queue.get(job_id)
+        if job is None:
+            st.session_state['job_id'] = None
+            st.query_params.pop("job", None)
+        elif not job.finished:
+            poll_job = True
+            if job.status == "queued":
+                st.info(f"Queued behind {job.position} other question(s)...")
+                st.button("Cancel", on_click=job_queue.cancel, args=(job_id,))
+            else:
+                st.info(f"Processing your query... ({job.seconds:.0f}s)")
+        else:
+            st.session_state['answered_job'] = job_id
+            if job.status == "done":
+                answer = job.result
+                st.session_state['query'] = answer.question
+                st.session_state['sql'] = answer.sql or ''
+                st.session_state['df'] = answer.df
+                st.session_state['agent_logs'] = answer.logs
+                st.session_state['answer'] = answer
+            else:
+                st.session_state['job_error'] = job.error or "The question was cancelled."
+    if st.session_state.get('job_error'):
+        st.error(f"Query failed: {st.session_state['job_error']}")
+
+    answer = st.session_state.get('answer')
+    if answer is not None:
+        stages = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in answer.timings.items())
+        st.caption(f"Answered by {answer.source} in {answer.total_seconds:.2f}s ({stages})")
+        if answer.df is None and answer.answer:
+            st.write(answer.answer)
+        elif answer.df is None and answer.error:
+            st.warning(f"Query failed: {answer.error}")
 
     if st.session_state['df'] is not None and not getattr(st.session_state['df'], 'empty', True):
+        if st.session_state['df'].attrs.get('truncated'):
+            st.caption(f"Showing the first {len(st.session_state['df'])} rows; refine the question or use the Test SQL tab to page through everything.")
         st.dataframe(st.session_state['df'])
     elif st.session_state['df'] is not None:
         st.write("No results found.")
@@ -249,44 +180,36 @@ with tabs[1]:
         st.header("Database Viewer")
         table = st.selectbox("Select Table", ["Users", "Posts", "Comments", "All Tables"], key="test_sql_table")
 
-    def test_sql_execute_query(query):
+    pool = get_pool(DB_PATH)
+
+    # Keyset-paginated view of one table: only page_size rows are read per
+    # rerun, and the rowid each page starts after is kept in session state
+    # (per page size, since the starts of one size don't fit another)
+    def show_table_page(table_name, page_size):
+        starts = st.session_state.setdefault('browse_starts', {}).setdefault((table_name, page_size), [None])
         try:
-            with sqlite3.connect(DB_PATH) as conn:
-                df = pd.read_sql_query(query, conn)
-            return df
+            page = pool.browse_table(table_name, after=starts[-1], page_size=page_size, page=len(starts) - 1)
         except Exception as e:
             st.error(f"Query failed: {str(e)}")
-            return pd.DataFrame()
-
-    if table == "Users":
-        st.header("Users Table")
-        query = "SELECT * FROM Users"
-        result = test_sql_execute_query(query)
-        st.dataframe(result)
-    elif table == "Posts":
-        st.header("Posts Table")
-        query = "SELECT * FROM Posts"
-        result = test_sql_execute_query(query)
-        st.dataframe(result)
-    elif table == "Comments":
-        st.header("Comments Table")
-        query = "SELECT * FROM Comments"
-        result = test_sql_execute_query(query)
-        st.dataframe(result)
+            return
+        first = page.page * page.page_size
+        st.caption(f"Rows {first + 1}–{first + len(page.df)} of ~{page.total}")
+        st.dataframe(page.df)
+        col_prev, col_next = st.columns(2)
+        col_prev.button("Previous", key=f"prev_{table_name}", disabled=len(starts) == 1, on_click=starts.pop)
+        col_next.button("Next", key=f"next_{table_name}", disabled=not page.has_more,
+                        on_click=starts.append, args=(page.next_key,))
+
+    page_size = st.sidebar.selectbox("Rows per page", PAGE_SIZES, index=1, key="test_sql_page_size")
+
+    if table in ("Users", "Posts", "Comments"):
+        st.header(f"{table} Table")
+        show_table_page(table, page_size)
     elif table == "All Tables":
         st.header("Database Overview")
-        st.subheader("Users")
-        query = "SELECT * FROM Users"
-        result = test_sql_execute_query(query)
-        st.dataframe(result)
-        st.subheader("Posts")
-        query = "SELECT * FROM Posts"
-        result = test_sql_execute_query(query)
-        st.dataframe(result)
-        st.subheader("Comments")
-        query = "SELECT * FROM Comments"
-        result = test_sql_execute_query(query)
-        st.dataframe(result)
+        for table_name in ("Users", "Posts", "Comments"):
+            st.subheader(table_name)
+            show_table_page(table_name, page_size)
         st.subheader("Relationships")
         st.write("Users → Posts")
         st.write("Users → Comments")
@@ -299,13 +222,35 @@ with tabs[1]:
         if not sql_query.strip():
             st.warning("Please enter a SQL query!")
         else:
-            with st.spinner("Executing query..."):
-                result_df = test_sql_execute_query(sql_query)
-                if result_df is not None and not result_df.empty:
-                    st.header("Query Results")
-                    st.dataframe(result_df)
-                else:
-                    st.info("No results returned from query")
+            st.session_state['custom_sql'] = sql_query
+            st.session_state['custom_sql_page'] = 1
+            # Executing again re-reads the database
+            st.session_state.pop('custom_sql_count', None)
+            st.session_state.pop('custom_sql_result', None)
+    custom_sql = st.session_state.get('custom_sql')
+    if custom_sql:
+        # The query is paged with LIMIT/OFFSET, so only one page is ever read,
+        # and each page is only read once
+        page = None
+        with st.spinner("Executing query..."):
+            counted, error = session_cached('custom_sql_count', custom_sql, lambda: pool.count_rows(custom_sql))
+            if counted is not None:
+                total, exact = counted
+                page_count = max(1, -(-total // page_size))
+                if st.session_state.get('custom_sql_page', 1) > page_count:
+                    st.session_state['custom_sql_page'] = 1
+                page_number = st.number_input(f"Page (of {page_count}{'' if exact else '+'})", min_value=1,
+                                              max_value=page_count, key='custom_sql_page')
+                page, error = session_cached('custom_sql_result', (custom_sql, page_number, page_size),
+                                             lambda: pool.fetch_page(custom_sql, page_number - 1, page_size))
+        if error is not None:
+            st.error(f"Query failed: {error}")
+        if page is not None and not page.df.empty:
+            st.header("Query Results")
+            st.caption(f"{total}{'' if exact else '+'} rows")
+            st.dataframe(page.df)
+        elif page is not None:
+            st.info("No results returned from query")
     st.markdown("---")
     st.write("""
     💡 **Tips:**
@@ -314,3 +259,9 @@ with tabs[1]:
     - Use ORDER BY to sort results
     - Remember to end queries with semicolon (;)
     """)
+
+# Check on a running question again shortly; each check is a short rerun, not
+# a script run blocked on the LLM
+if poll_job:
+    time.sleep(JOB_POLL_SECONDS)
+    st.rerun()
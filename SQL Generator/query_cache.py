@@ -0,0 +1,219 @@
+import re
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+
+import numpy as np
+
+from sql_executor import get_pool
+
+CACHE_PATH = "query_cache.db"
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+# Cosine similarity needed for a paraphrase to reuse cached SQL
+SIMILARITY_THRESHOLD = 0.88
+# Below this many content tokens a bag of words can't tell "comments on posts"
+# from "posts with comments": only the exact (ordered) tier may answer
+MIN_SEMANTIC_TOKENS = 4
+EMBEDDING_DIM = 1024
+
+# Words that carry no meaning for SQL generation ("show me all the ...")
+_STOPWORDS = {
+    "a", "an", "the", "me", "my", "us", "our", "i", "we", "you", "please", "can", "could", "would", "will",
+    "show", "list", "display", "give", "get", "find", "fetch", "return", "retrieve", "select", "tell",
+    "what", "which", "who", "whose", "are", "is", "was", "were", "be", "been", "do", "does", "did",
+    "all", "every", "each", "of", "in", "on", "for", "to", "from", "by", "with", "that", "this", "those",
+    "these", "there", "their", "and", "or", "as", "at", "any", "some", "want", "need", "see", "know",
+}
+_SYNONYMS = {
+    "people": "user", "person": "user", "member": "user", "account": "user", "men": "male", "man": "male",
+    "boy": "male", "women": "female", "woman": "female", "girl": "female", "older": "above", "greater": "above",
+    "over": "above", "more": "above", "younger": "below", "less": "below", "under": "below", "fewer": "below",
+    "posted": "post", "commented": "comment", "wrote": "post", "written": "post", "author": "user",
+    "poster": "user", "commenter": "user",
+}
+# Tokens that flip the meaning of a question; paraphrase matches must agree on them exactly
+_POLARITY = {
+    "male", "female", "above", "below", "before", "after", "not", "no", "without", "most", "least", "top",
+    "bottom", "max", "maximum", "min", "minimum", "highest", "lowest", "first", "last", "average", "count",
+    "number", "total", "sum", "between", "equal", "exactly", "only", "never", "spam", "negative", "positive",
+}
+_TOKEN_RE = re.compile(r"[a-z0-9_@.'-]+")
+
+def _singular(token):
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss") and not token.isdigit():
+        return token[:-1]
+    return token
+
+def tokenize(question):
+    tokens = []
+    for token in _TOKEN_RE.findall(question.lower()):
+        token = token.strip(".'-")
+        if not token or token in _STOPWORDS:
+            continue
+        token = _SYNONYMS.get(token, _singular(token))
+        tokens.append(_SYNONYMS.get(token, token))
+    return tokens
+
+# Exact-match key: "Show me all the male users" and "list male users" both -> "male user"
+def normalize_question(question):
+    return " ".join(tokenize(question))
+
+# Literals (numbers, usernames, emails, dates) and polarity words must be
+# identical for two questions to share SQL, however similar they look.
+def _guard_tokens(tokens):
+    return frozenset(t for t in tokens if t in _POLARITY or any(c.isdigit() for c in t) or "_" in t or "@" in t)
+
+# Words the SQL depends on: identifiers (split on "_") and literal contents,
+# normalized like question tokens ("Posts" -> post, '%travel%' -> travel)
+def _sql_words(sql):
+    words = set()
+    for token in _TOKEN_RE.findall(sql.lower()):
+        for part in token.strip(".'-").replace(".", "_").split("_"):
+            if part:
+                words.add(_SYNONYMS.get(part, _singular(part)))
+    return words
+
+# A paraphrase may drop words from the cached question only if the cached SQL
+# doesn't use them: "... about travel" must not answer "... about food".
+def _differences_fit(tokens, cached_tokens, sql):
+    return not (set(cached_tokens) - set(tokens)) & _sql_words(sql)
+
+def _feature(text):
+    return zlib.crc32(text.encode("utf-8")) % EMBEDDING_DIM
+
+# Local hashed bag-of-words embedding (unigrams + bigrams), L2-normalized
+def embed(tokens):
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    for token in tokens:
+        vector[_feature(token)] += 1.0
+    for first, second in zip(tokens, tokens[1:]):
+        vector[_feature(first + " " + second)] += 0.5
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+# Fingerprint of the database schema (sqlite_master). Cached SQL is re-executed
+# on every hit, so data changes can't make it stale; schema changes can.
+def schema_fingerprint(db_path):
+    with get_pool(db_path).connection() as conn:
+        rows = conn.execute("SELECT type, name, sql FROM sqlite_master ORDER BY type, name").fetchall()
+    return hashlib.sha256(repr(rows).encode("utf-8")).hexdigest()[:16]
+
+# Two-level NL->SQL cache: exact match on the normalized question, then a
+# nearest-neighbour lookup over local embeddings for paraphrases. Only SQL that
+# executed successfully is stored, entries expire after ttl_seconds, and entries
+# for any other schema fingerprint are ignored (and purged).
+class QueryCache:
+    def __init__(self, path=CACHE_PATH, ttl_seconds=DEFAULT_TTL_SECONDS, threshold=SIMILARITY_THRESHOLD):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+        self._index = None  # (fingerprint, ids, matrix, guards, sqls, tokens) for semantic lookup
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS cached_queries (
+                id INTEGER PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                normalized TEXT NOT NULL,
+                question TEXT NOT NULL,
+                sql TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                UNIQUE (fingerprint, normalized)
+            )
+        ''')
+        self._conn.commit()
+
+    # Returns (sql, match) with match "exact" or "semantic", or None on a miss.
+    # validate(sql), if given, re-checks a semantic candidate's SQL against the
+    # new question; candidates it rejects are skipped.
+    def lookup(self, question, fingerprint, validate=None):
+        tokens = tokenize(question)
+        normalized = " ".join(tokens)
+        with self._lock:
+            self._purge(fingerprint)
+            row = self._conn.execute(
+                "SELECT id, sql FROM cached_queries WHERE fingerprint = ? AND normalized = ?",
+                (fingerprint, normalized),
+            ).fetchone()
+            if row is not None:
+                self._record_hit(row[0], "exact_hits")
+                return row[1], "exact"
+            if len(tokens) >= MIN_SEMANTIC_TOKENS:
+                match = self._nearest(tokens, fingerprint, validate)
+                if match is not None:
+                    self._record_hit(match[0], "semantic_hits")
+                    return match[1], "semantic"
+            self.stats["misses"] += 1
+            return None
+
+    def store(self, question, sql, fingerprint):
+        tokens = tokenize(question)
+        if not tokens:
+            return
+        with self._lock:
+            self._conn.execute('''
+                INSERT INTO cached_queries (fingerprint, normalized, question, sql, embedding, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(fingerprint, normalized) DO UPDATE SET
+                    sql = excluded.sql, question = excluded.question, created_at = excluded.created_at
+            ''', (fingerprint, " ".join(tokens), question, sql, embed(tokens).tobytes(), time.time()))
+            self._conn.commit()
+            self._index = None
+
+    # Drop an entry whose SQL no longer runs
+    def invalidate(self, question, fingerprint):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM cached_queries WHERE fingerprint = ? AND normalized = ?",
+                (fingerprint, normalize_question(question)),
+            )
+            self._conn.commit()
+            self._index = None
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cached_queries")
+            self._conn.commit()
+            self._index = None
+
+    def _record_hit(self, entry_id, counter):
+        self._conn.execute("UPDATE cached_queries SET hits = hits + 1 WHERE id = ?", (entry_id,))
+        self._conn.commit()
+        self.stats[counter] += 1
+
+    def _purge(self, fingerprint):
+        deleted = self._conn.execute(
+            "DELETE FROM cached_queries WHERE fingerprint != ? OR created_at < ?",
+            (fingerprint, time.time() - self.ttl_seconds),
+        ).rowcount
+        if deleted:
+            self._conn.commit()
+            self._index = None
+
+    def _nearest(self, tokens, fingerprint, validate=None):
+        if self._index is None or self._index[0] != fingerprint:
+            rows = self._conn.execute(
+                "SELECT id, normalized, sql, embedding FROM cached_queries WHERE fingerprint = ?", (fingerprint,)
+            ).fetchall()
+            matrix = np.array([np.frombuffer(r[3], dtype=np.float32) for r in rows]).reshape(len(rows), EMBEDDING_DIM)
+            guards = [_guard_tokens(r[1].split()) for r in rows]
+            self._index = (fingerprint, [r[0] for r in rows], matrix, guards, [r[2] for r in rows],
+                           [r[1].split() for r in rows])
+        _, ids, matrix, guards, sqls, cached_tokens = self._index
+        if not ids:
+            return None
+        scores = matrix @ embed(tokens)
+        guard = _guard_tokens(tokens)
+        for i in np.argsort(-scores):
+            if scores[i] < self.threshold:
+                break
+            if (guards[i] == guard and _differences_fit(tokens, cached_tokens[i], sqls[i])
+                    and (validate is None or validate(sqls[i]))):
+                return ids[i], sqls[i]
+        return None
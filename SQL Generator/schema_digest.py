@@ -0,0 +1,141 @@
+import re
+import threading
+
+from query_cache import schema_fingerprint, tokenize
+from sql_executor import get_pool, quote_identifier
+
+# Rows sampled per column to find low-cardinality values (gender codes etc.)
+SAMPLE_ROWS = 2000
+# Columns with at most this many distinct values get them listed in the digest
+MAX_HINT_VALUES = 6
+MAX_HINT_LENGTH = 20
+
+# Question words that point at a column without naming it
+_COLUMN_SYNONYMS = {
+    "gender": {"male", "female", "men", "women", "man", "woman", "boy", "girl", "gender"},
+    "age": {"age", "aged", "old", "older", "young", "younger", "year-old"},
+    "username": {"username", "name", "named"},
+    "gmail": {"email", "gmail", "mail"},
+    "content": {"content", "text", "about", "mention", "mentions", "mentioning"},
+    "comment": {"comment", "comments", "spam", "negative", "positive", "reply", "replies"},
+}
+_WORD_RE = re.compile(r"[a-z0-9_@.]+")
+
+_cache_lock = threading.Lock()
+_digests = {}
+
+def _singular(word):
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+
+def _is_date_column(name, declared_type, table_sql):
+    return (
+        name.endswith(("_date", "_at", "_time")) or "DATE" in declared_type.upper() or "TIME" in declared_type.upper()
+        or f"strftime('%Y-%m-%d %H:%M:%S', {name})" in table_sql
+    )
+
+# Describe one column: "gender TEXT ['F','M']", "post_date TEXT date 2020-09-15..2025-05-01",
+# "user_id INTEGER -> Users.user_id"
+def _describe_column(conn, table, table_sql, column, foreign_keys):
+    _, name, declared_type, _, _, pk = column
+    parts = [name, declared_type or "ANY"]
+    if pk:
+        parts.append("PK")
+    if name in foreign_keys:
+        parts.append(f"-> {foreign_keys[name]}")
+        return " ".join(parts)
+    quoted = quote_identifier(name)
+    if _is_date_column(name, declared_type, table_sql):
+        # min/max are index seeks when the column is indexed
+        low, high = conn.execute(f"SELECT min({quoted}), max({quoted}) FROM {quote_identifier(table)}").fetchone()
+        if low is not None:
+            parts.append(f"date {str(low)[:10]}..{str(high)[:10]}")
+        return " ".join(parts)
+    if pk:
+        return " ".join(parts)
+    values = {
+        row[0] for row in conn.execute(
+            f"SELECT {quoted} FROM {quote_identifier(table)} WHERE {quoted} IS NOT NULL LIMIT {SAMPLE_ROWS}"
+        )
+    }
+    if values and len(values) <= MAX_HINT_VALUES and all(len(str(v)) <= MAX_HINT_LENGTH for v in values):
+        parts.append("[" + ",".join(repr(v) for v in sorted(values, key=str)) + "]")
+    return " ".join(parts)
+
+# {table: (one-line description, data column names, tables its foreign keys
+# reference)} for every user table.
+# Sampling is bounded, so building it costs the same on a 50-row and a
+# 10M-row database.
+def build_digest(db_path):
+    digest = {}
+    with get_pool(db_path).connection() as conn:
+        tables = conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        ).fetchall()
+        for table, table_sql in tables:
+            foreign_keys = {
+                row[3]: f"{row[2]}.{row[4]}"
+                for row in conn.execute(f"PRAGMA foreign_key_list({quote_identifier(table)})")
+            }
+            columns = conn.execute(f"PRAGMA table_info({quote_identifier(table)})").fetchall()
+            described = [_describe_column(conn, table, table_sql or "", c, foreign_keys) for c in columns]
+            # Key columns (PK/FK) name other tables' concepts ("user_id" in Posts),
+            # so only a table's own data columns are matched against questions
+            data_columns = [c[1] for c in columns if not c[5] and c[1] not in foreign_keys]
+            referenced = sorted({target.split(".")[0] for target in foreign_keys.values()})
+            digest[table] = (f"{table}({', '.join(described)})", data_columns, referenced)
+    return digest
+
+# Cached per schema fingerprint (hash of sqlite_master), so it is rebuilt only
+# when tables or columns change. Value hints and date ranges are a snapshot
+# taken when the digest was built.
+def get_digest(db_path):
+    fingerprint = schema_fingerprint(db_path)
+    with _cache_lock:
+        cached = _digests.get(db_path)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+    digest = build_digest(db_path)
+    with _cache_lock:
+        _digests[db_path] = (fingerprint, digest)
+    return digest
+
+# Tables a question is about: ones it names ("posts", "posted", "authors" via
+# the query cache's synonyms), ones whose columns it names or implies
+# ("male" -> Users.gender), and Users for literal usernames ("john_doe")
+def matched_tables(question, digest):
+    words = {_singular(w.strip(".")) for w in _WORD_RE.findall(question.lower())}
+    words |= set(tokenize(question))
+    chosen = set()
+    for table, (_, columns, _) in digest.items():
+        if _singular(table.lower()) in words:
+            chosen.add(table)
+            continue
+        for column in columns:
+            keys = {column.lower()} | _COLUMN_SYNONYMS.get(column.lower(), set())
+            keys |= {p for p in column.lower().split("_") if p not in ("id", "date")}
+            if words & {_singular(k) for k in keys}:
+                chosen.add(table)
+                break
+    if any("_" in w or "@" in w for w in words) and "Users" in digest:
+        chosen.add("Users")
+    return [t for t in digest if t in chosen]
+
+# matched_tables plus every table they reference through a foreign key, so the
+# prompt can always join e.g. a post to its author. Falls back to every table
+# when nothing matches.
+def relevant_tables(question, digest):
+    chosen = set(matched_tables(question, digest))
+    pending = list(chosen)
+    while pending:
+        for referenced in digest[pending.pop()][2]:
+            if referenced in digest and referenced not in chosen:
+                chosen.add(referenced)
+                pending.append(referenced)
+    return [t for t in digest if t in chosen] or list(digest)
+
+# Compact schema text for prompts: only the tables relevant to the question
+# (all of them when question is None), one line each
+def schema_prompt(db_path, question=None):
+    digest = get_digest(db_path)
+    tables = list(digest) if question is None else relevant_tables(question, digest)
+    return "\n".join(digest[t][0] for t in tables)
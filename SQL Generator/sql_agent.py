@@ -0,0 +1,421 @@
+import os
+import re
+import sys
+import time
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from typing import Optional
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+from langchain_together import Together
+from langchain_community.utilities import SQLDatabase
+from langchain_community.agent_toolkits.sql.toolkit import SQLDatabaseToolkit
+from langchain.prompts import PromptTemplate
+from langchain.agents import initialize_agent
+from langchain.agents.agent_types import AgentType
+from langchain.schema import OutputParserException
+from langchain.tools import Tool
+from langchain_core.callbacks import BaseCallbackHandler
+import io
+import contextlib
+from query_cache import QueryCache, schema_fingerprint
+from sql_executor import get_pool, is_select
+from schema_digest import get_digest, matched_tables, schema_prompt
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.llm_replay import wrap_llm
+from common.tracing import annotate, count, current_trace, record_llm_call, span, start_trace
+
+
+os.environ["TOGETHER_API_KEY"] = "YOUR API KEY"
+
+# Initialize LLM
+llm = Together(
+    model="meta-llama/Llama-4-Scout-17B-16E-Instruct",
+    max_tokens=512,
+    temperature=0.7
+)
+# Recorded/replayed stand-in when LLM_MODE is set (see common/llm_replay.py)
+llm = wrap_llm(llm)
+
+DB_PATH = "social_media.db"
+
+INSTRUCTION_PROMPT = """
+You are an intelligent assistant that translates natural language into correct SQL queries.
+- Always use correct SQL syntax.
+- Use only the provided tables and columns.
+- Do not use any table or column that is not listed in the schema.
+- If the user refers to something not in the schema, ignore it.
+- Only use the tables: Users, Posts, Comments.
+- The schema lists each table as Table(column TYPE, ...): "-> Table.column" marks a foreign key, [...] lists every value a column takes and "date A..B" gives a date column's range.
+- Dates are stored as text 'YYYY-MM-DD HH:MM:SS'. Filter them with ranges on the bare column (e.g. post_date >= '2024-01-01' AND post_date < '2025-01-01') so indexes can be used.
+- Return ONLY the SQL query, nothing else.
+- Do not explain or add commentary.
+- Do NOT use code blocks or markdown formatting. Output only plain SQL.
+
+NOTE : Give the SQL Query directly without any special characters like '```' and avoid duplicate queries
+
+Go through user question carefully and generate the correct SQL query.
+
+Schema:
+{schema}
+
+User Question: {input}
+SQL Query:
+"""
+
+prompt_template = PromptTemplate(
+    input_variables=["schema", "input"],
+    template=INSTRUCTION_PROMPT
+)
+
+SQL_REPAIR_PROMPT = """
+You are an intelligent assistant that fixes SQL queries for SQLite.
+The query below was written for the user question but fails against the database.
+- Fix the query so it answers the question and runs on SQLite.
+- Use only the provided tables and columns.
+- Return ONLY the corrected SQL query, nothing else.
+- Do NOT use code blocks or markdown formatting. Output only plain SQL.
+
+Schema:
+{schema}
+
+User Question: {input}
+Failing SQL Query: {sql}
+SQLite Error: {error}
+Corrected SQL Query:
+"""
+
+repair_template = PromptTemplate(
+    input_variables=["schema", "input", "sql", "error"],
+    template=SQL_REPAIR_PROMPT
+)
+
+def elaborate_user_query(nl_query: str) -> str:
+    prompt = f"""
+You are a helpful assistant who clarifies vague or subjective natural language database queries.
+
+Given the query:
+"{nl_query}"
+
+1. Identify and explain any ambiguous or subjective terms (e.g., "popular", "negative", "recent").
+2. Suggest how they could be interpreted in terms of the schema (Users, Posts, Comments).
+3. Rephrase the query in a more precise way to help an LLM generate SQL.
+
+Response:
+"""
+    response = llm.predict(prompt)
+    record_llm_call(prompt, response)
+    return response.strip()
+
+query_explainer_tool = Tool(
+    name="QueryExplainer",
+    func=elaborate_user_query,
+    description=(
+        """Use this tool when the user's question is vague, emotional, or subjective. 
+        This tool helps clarify terms like 'negative', 'frequent', 'popular', etc. 
+        Input should be the raw user question. The tool explains how to interpret the query clearly. Also provide with diverse examples to make the subjective query as clear as possible"""
+    ),
+)
+
+# Agents and toolkits are built once per database and schema
+# version, then reused for every question (and across Streamlit reruns, since
+# this module is only imported once per process).
+_cache_lock = threading.Lock()
+_databases = {}
+_agents = {}
+
+# SQLite bumps PRAGMA schema_version on every CREATE/ALTER/DROP, so it tells us
+# when the cached schema description and agent are stale.
+def schema_version(db_path=DB_PATH):
+    with get_pool(db_path).connection() as conn:
+        return conn.execute("PRAGMA schema_version").fetchone()[0]
+
+def _cache_key(db_path):
+    return os.path.abspath(db_path), schema_version(db_path)
+
+# Drop entries built for an older schema version of the same database
+def _prune(cache, key):
+    for stale in [k for k in cache if k[0] == key[0] and k[1] != key[1]]:
+        del cache[stale]
+
+def get_database(db_path=DB_PATH):
+    key = _cache_key(db_path)
+    with _cache_lock:
+        if key not in _databases:
+            _prune(_databases, key)
+            # The agent's tools check connections out of the shared read-only
+            # pool; NullPool makes SQLAlchemy hand each one straight back.
+            engine = create_engine("sqlite://", creator=get_pool(db_path).acquire, poolclass=NullPool)
+            _databases[key] = SQLDatabase(engine)
+        return _databases[key]
+
+def get_agent(db_path=DB_PATH, capture_verbose=False):
+    key = _cache_key(db_path) + (capture_verbose,)
+    with _cache_lock:
+        agent = _agents.get(key)
+    if agent is not None:
+        return agent
+    db = get_database(db_path)
+    # The agent answers any question, so its prefix carries the whole digest
+    schema = schema_prompt(db_path)
+    toolkit = SQLDatabaseToolkit(db=db, llm=llm)
+    tools = toolkit.get_tools()
+    tools.append(query_explainer_tool)
+
+    agent = initialize_agent(
+        agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+        tools=tools,
+        llm=llm,
+        verbose=True if capture_verbose else False,
+        handle_parsing_errors=True,
+        return_intermediate_steps=True,
+        agent_kwargs={
+            "prefix": prompt_template.template.format(schema=schema, input="{input}")
+        }
+    )
+    with _cache_lock:
+        _prune(_agents, key)
+        return _agents.setdefault(key, agent)
+
+# Feeds the agent's LLM calls and tool runs into the current trace: every ReAct
+# step counts as an LLM call, and tool time is recorded as agent/<tool> (a
+# part of the "agent" stage, not in addition to it)
+class _TraceCallbackHandler(BaseCallbackHandler):
+    def __init__(self):
+        self._prompts = {}
+        self._tools = {}
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._prompts[run_id] = "".join(prompts)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        usage = (getattr(response, "llm_output", None) or {}).get("token_usage") or {}
+        completion = "".join(g.text for gens in response.generations for g in gens)
+        record_llm_call(self._prompts.pop(run_id, ""), completion,
+                        usage.get("prompt_tokens"), usage.get("completion_tokens"))
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._tools[run_id] = ((serialized or {}).get("name"), time.perf_counter())
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        name, started = self._tools.pop(run_id, (None, None))
+        if started is not None:
+            trace = current_trace()
+            if trace is not None:
+                trace.add_stage(f"agent/{name or 'tool'}", time.perf_counter() - started)
+
+    on_tool_error = on_tool_end
+
+# Returns (answer, logs, steps): the agent's final answer, its captured verbose
+# output and its intermediate (action, observation) steps
+def run_agent(query, max_retries=2, capture_verbose=False, db_path=DB_PATH):
+    agent = get_agent(db_path, capture_verbose)
+    config = {"callbacks": [_TraceCallbackHandler()]}
+
+    retries = 0
+    while retries < max_retries:
+        try:
+            if capture_verbose:
+                buf = io.StringIO()
+                with contextlib.redirect_stdout(buf):
+                    result = agent.invoke({"input": query}, config=config)
+                logs = buf.getvalue()
+            else:
+                result, logs = agent.invoke({"input": query}, config=config), None
+            return result["output"], logs, result.get("intermediate_steps", [])
+        except OutputParserException:
+            retries += 1
+            count("retries")
+    raise Exception("Failed to parse LLM output after retries.")
+
+def clean_sql(text):
+    sql = str(text).strip()
+    if sql.startswith("```"):
+        sql = sql.replace("```sql", "").replace("```", "").strip()
+    return sql.split(";")[0].strip()
+
+# The SQL behind an agent run: its final answer if that is a query, otherwise
+# the last query it ran through the sql_db_query tool. None if it never ran one.
+def sql_from_agent(answer, steps):
+    if isinstance(answer, str) and is_select(clean_sql(answer)):
+        return clean_sql(answer)
+    for action, _ in reversed(steps or []):
+        if getattr(action, "tool", None) == "sql_db_query":
+            sql = clean_sql(getattr(action, "tool_input", ""))
+            if is_select(sql):
+                return sql
+    return None
+
+def fallback_llm(query, db_path=DB_PATH):
+    schema = schema_prompt(db_path, query)
+    prompt_text = prompt_template.format(schema=schema, input=query)
+    raw_output = llm.predict(prompt_text)
+    record_llm_call(prompt_text, raw_output)
+    return clean_sql(raw_output)
+
+# One repair round trip for SQL that failed validation
+def repair_sql(query, sql, error, db_path=DB_PATH):
+    schema = schema_prompt(db_path, query)
+    prompt_text = repair_template.format(schema=schema, input=query, sql=sql, error=error)
+    raw_output = llm.predict(prompt_text)
+    record_llm_call(prompt_text, raw_output)
+    return clean_sql(raw_output)
+
+# Compile the query against the live database without running it. SQLite's
+# EXPLAIN prepares the statement, so unknown tables/columns and syntax errors
+# surface here in well under a millisecond. Returns the error message or None.
+def validate_sql(sql, db_path=DB_PATH):
+    if not is_select(sql):
+        return "LLM output does not appear to be a valid SELECT SQL query."
+    try:
+        with get_pool(db_path).connection() as conn:
+            conn.execute("EXPLAIN " + sql).fetchall()
+        return None
+    except sqlite3.Error as e:
+        return str(e)
+
+def execute_sql(sql, db_path=DB_PATH):
+    if not is_select(sql):
+        return None, "LLM output does not appear to be a valid SELECT SQL query."
+    try:
+        with span("execute"):
+            df = get_pool(db_path).read_sql(sql)
+        annotate(rows=len(df))
+        return df, None
+    except Exception as e:
+        return None, str(e)
+
+# Everything produced for one question. source is "cache (exact)",
+# "cache (semantic)", "fast", "fast (repaired)", "agent" or "fallback";
+# timings maps each stage that ran (cache_lookup, generate, validate, repair,
+# agent, fallback_llm, execute) to its wall time in seconds; "agent/..." entries
+# break the agent stage down by tool. counters holds the request's trace
+# counters (llm_calls, tokens_in, tokens_out, cache_hits, retries, ...).
+@dataclass
+class QueryAnswer:
+    question: str
+    sql: Optional[str] = None
+    df: Optional[pd.DataFrame] = None
+    answer: Optional[str] = None
+    error: Optional[str] = None
+    source: Optional[str] = None
+    logs: str = ""
+    timings: dict = field(default_factory=dict)
+    counters: dict = field(default_factory=dict)
+
+    @property
+    def total_seconds(self):
+        return sum(seconds for name, seconds in self.timings.items() if "/" not in name)
+
+# Fast mode: one generation from the static schema prompt, checked locally with
+# validate_sql, plus at most one repair generation. Returns (sql, error); error
+# is None when the SQL compiled against the live database.
+def _generate_fast(question, result, db_path):
+    with span("generate"):
+        sql = fallback_llm(question, db_path)
+    with span("validate"):
+        error = validate_sql(sql, db_path)
+    result.source = "fast"
+    if error:
+        with span("repair"):
+            sql = repair_sql(question, sql, error, db_path)
+        with span("validate"):
+            error = validate_sql(sql, db_path)
+        result.source = "fast (repaired)"
+    return sql, error
+
+# The single planning pipeline behind the app: cache -> (fast mode) -> agent ->
+# fallback LLM, then one execution of the chosen SQL. Each stage runs at most
+# once, so a question never repeats an LLM generation. In fast mode the agent
+# only runs when the single-shot SQL still fails validation after its repair,
+# and the fallback is skipped since fast mode already made that generation.
+# The fallback only runs when the agent raised; an agent that answered without
+# running a query returns its text answer with no SQL.
+def answer_question(question, cache=None, db_path=DB_PATH, capture_verbose=True, fast=True):
+    result = QueryAnswer(question=question)
+    with start_trace("nl_to_sql", question=question, fast=fast) as trace:
+        _answer(question, result, cache, db_path, capture_verbose, fast)
+        trace.annotate(source=result.source, error=result.error)
+    result.timings = dict(trace.stages)
+    result.counters = dict(trace.counters)
+    return result
+
+# A paraphrase match is only trusted if its SQL uses every table the new
+# question is about ("posts with comments" needs Posts, not just Comments)
+def _sql_covers_question(question, sql, db_path):
+    digest = get_digest(db_path)
+    tables = matched_tables(question, digest) or list(digest)
+    return all(re.search(rf"\b{re.escape(table)}\b", sql, re.IGNORECASE) for table in tables)
+
+def _answer(question, result, cache, db_path, capture_verbose, fast):
+    fingerprint = None
+    if cache is not None:
+        with span("cache_lookup"):
+            fingerprint = schema_fingerprint(db_path)
+            cached = cache.lookup(question, fingerprint,
+                                  validate=lambda sql: _sql_covers_question(question, sql, db_path))
+        count("cache_hits" if cached else "cache_misses")
+        if cached:
+            sql, match = cached
+            df, error = execute_sql(sql, db_path)
+            if error is None:
+                result.sql, result.df, result.source = sql, df, f"cache ({match})"
+                result.logs = f"(Answered from the query cache, {match} match.)"
+                return
+            # Cached SQL no longer runs; drop it and plan the question again
+            cache.invalidate(question, fingerprint)
+
+    fast_sql = None
+    if fast:
+        fast_sql, error = _generate_fast(question, result, db_path)
+        if error is None:
+            result.sql = fast_sql
+            result.logs = "(Single-shot SQL generation; the agent was not needed.)"
+
+    agent_failed = False
+    if result.sql is None:
+        try:
+            with span("agent"):
+                answer, logs, steps = run_agent(question, capture_verbose=capture_verbose, db_path=db_path)
+            result.logs = logs or ""
+            result.source = "agent"
+            if isinstance(answer, (pd.DataFrame, dict, list)):
+                result.df = answer if isinstance(answer, pd.DataFrame) else pd.DataFrame(answer)
+            else:
+                result.answer = str(answer).strip()
+            result.sql = sql_from_agent(answer, steps)
+        except Exception as e:
+            agent_failed = True
+            result.error = str(e)
+            result.logs = "(No agent logs available for fallback LLM mode.)"
+
+    # An agent that ran no query (it answered in prose or said it can't) keeps
+    # its text answer; the fallbacks are only for when the agent itself failed
+    if agent_failed and result.sql is None and result.df is None:
+        if fast_sql is not None:
+            # Nothing better than the fast-mode attempt; show it with its error
+            result.sql, result.source = fast_sql, "fast"
+        else:
+            with span("fallback_llm"):
+                result.sql = fallback_llm(question, db_path)
+            result.source = "fallback"
+
+    if result.sql and result.df is None:
+        result.df, result.error = execute_sql(result.sql, db_path)
+
+    # Only SQL that actually ran is worth reusing
+    if cache is not None and result.df is not None and is_select(result.sql):
+        cache.store(question, result.sql, fingerprint)
+
+# Job queue handler for "nl_to_sql" jobs; runs in a worker process, which keeps
+# its own connection to the shared query cache
+_job_cache = None
+
+def answer_job(payload, report):
+    global _job_cache
+    if _job_cache is None:
+        _job_cache = QueryCache()
+    return answer_question(payload["question"], cache=_job_cache, fast=payload.get("fast", True))
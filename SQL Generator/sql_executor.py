@@ -0,0 +1,279 @@
+import os
+import time
+import queue
+import sqlite3
+import threading
+from urllib.parse import quote
+from contextlib import closing, contextmanager
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import pandas as pd
+
+DEFAULT_POOL_SIZE = 4
+# Seconds a single query may run before it is interrupted
+DEFAULT_QUERY_TIMEOUT = 10.0
+# Per-connection page cache (negative = KiB) and memory-mapped I/O window
+CACHE_SIZE_KIB = 16384
+MMAP_SIZE = 256 * 1024 * 1024
+# Prepared statements kept per connection by the sqlite3 module
+CACHED_STATEMENTS = 256
+# Most rows ever materialized for one result; larger results are truncated
+MAX_RESULT_ROWS = 5000
+DEFAULT_PAGE_SIZE = 100
+# The progress handler runs every this many SQLite VM instructions
+_PROGRESS_STEPS = 10000
+
+class QueryTimeout(Exception):
+    pass
+
+# One page of a result. total is the row count when known (exact if
+# total_exact, otherwise an estimate or a lower bound); next_key is the keyset
+# cursor for the following page when browsing a table.
+@dataclass
+class ResultPage:
+    df: pd.DataFrame
+    page: int
+    page_size: int
+    has_more: bool
+    total: Optional[int] = None
+    total_exact: bool = False
+    next_key: Any = None
+
+# Trailing semicolons (and whitespace) break the query once it is wrapped in a
+# subquery for paging/counting
+def strip_sql(sql):
+    return sql.strip().rstrip(";").strip()
+
+# Queries that can be wrapped in a subquery (for paging/counting) and cached
+def is_select(sql):
+    return bool(sql) and sql.lower().startswith(("select", "with"))
+
+def quote_identifier(name):
+    return '"' + name.replace('"', '""') + '"'
+
+# A connection whose close() hands it back to its pool instead of closing it,
+# so the pool can also be given to SQLAlchemy (and so LangChain's SQLDatabase)
+# as a plain connection factory.
+class _PooledConnection(sqlite3.Connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = None
+        self.checked_out = False
+        self.deadline = None
+        self.timeout = None
+
+    def close(self):
+        if self.pool is not None and self.checked_out:
+            self.pool._release(self)
+        elif self.pool is None:
+            super().close()
+
+    def discard(self):
+        self.pool = None
+        super().close()
+
+# WAL lets readers run alongside a writer (e.g. create_db.py re-seeding). The
+# journal mode is stored in the database file, so this only needs a writable
+# connection once; read-only connections can't change it.
+def enable_wal(db_path):
+    try:
+        with closing(sqlite3.connect(db_path, timeout=30)) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+    except sqlite3.Error:
+        pass
+
+# Fixed-size pool of read-only connections (mode=ro URI plus query_only), each
+# with a large page cache, mmap I/O and a prepared-statement cache. Every
+# checkout gets a deadline enforced by a progress handler, so a runaway query
+# is interrupted instead of holding a connection forever.
+class ReadOnlyPool:
+    def __init__(self, db_path, size=DEFAULT_POOL_SIZE, timeout=DEFAULT_QUERY_TIMEOUT):
+        self.db_path = os.path.abspath(db_path)
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._closed = False
+        enable_wal(self.db_path)
+
+    def _open(self):
+        conn = sqlite3.connect(
+            f"file:{quote(self.db_path)}?mode=ro", uri=True, timeout=30, check_same_thread=False,
+            cached_statements=CACHED_STATEMENTS, factory=_PooledConnection,
+        )
+        conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KIB}")
+        conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        conn.execute("PRAGMA query_only=ON")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.pool = self
+        return conn
+
+    # Check out a connection; close() returns it to the pool. Blocks while all
+    # `size` connections are in use.
+    def acquire(self, timeout=None):
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._open()
+        except Exception:
+            self._slots.release()
+            raise
+        timeout = self.timeout if timeout is None else timeout
+        conn.timeout = timeout
+        conn.deadline = time.monotonic() + timeout if timeout else None
+        if conn.deadline is not None:
+            conn.set_progress_handler(lambda: time.monotonic() > conn.deadline, _PROGRESS_STEPS)
+        conn.checked_out = True
+        return conn
+
+    def _release(self, conn):
+        conn.checked_out = False
+        conn.set_progress_handler(None, 0)
+        conn.deadline = None
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.discard()
+            conn = None
+        if conn is not None:
+            if self._closed:
+                conn.discard()
+            else:
+                self._idle.put(conn)
+        self._slots.release()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    # Run a query and return (columns, rows); raises QueryTimeout past the deadline
+    def execute(self, sql, params=(), timeout=None):
+        with self.connection(timeout) as conn:
+            try:
+                cursor = conn.execute(sql, params)
+                return [d[0] for d in cursor.description or ()], cursor.fetchall()
+            except sqlite3.OperationalError as e:
+                _raise_if_timed_out(conn, e)
+                raise
+
+    # (columns, first `limit` rows) of a statement run as is
+    def _execute_head(self, sql, params, limit, timeout=None):
+        with self.connection(timeout) as conn:
+            try:
+                cursor = conn.execute(sql, params or ())
+                return [d[0] for d in cursor.description or ()], cursor.fetchmany(limit)
+            except sqlite3.OperationalError as e:
+                _raise_if_timed_out(conn, e)
+                raise
+
+    # DataFrame of at most max_rows rows; df.attrs["truncated"] tells whether
+    # the query returned more than that
+    def read_sql(self, sql, params=(), timeout=None, max_rows=MAX_RESULT_ROWS):
+        with self.connection(timeout) as conn:
+            try:
+                cursor = conn.execute(sql, params or ())
+                columns = [d[0] for d in cursor.description or ()]
+                rows = cursor.fetchall() if max_rows is None else cursor.fetchmany(max_rows + 1)
+            except sqlite3.OperationalError as e:
+                _raise_if_timed_out(conn, e)
+                raise
+        truncated = max_rows is not None and len(rows) > max_rows
+        df = pd.DataFrame.from_records(rows[:max_rows] if truncated else rows, columns=columns)
+        df.attrs["truncated"] = truncated
+        return df
+
+    # Page `page` (0-based) of an arbitrary query via LIMIT/OFFSET; fetches one
+    # extra row to know whether another page follows. The newline before ")"
+    # keeps a trailing "-- comment" from swallowing it. Other statements
+    # (PRAGMA, EXPLAIN, ...) can't be subqueries: they run as is and the rows
+    # before the page are skipped.
+    def fetch_page(self, sql, page=0, page_size=DEFAULT_PAGE_SIZE, params=(), timeout=None):
+        if is_select(strip_sql(sql)):
+            wrapped = f"SELECT * FROM ({strip_sql(sql)}\n) LIMIT ? OFFSET ?"
+            columns, rows = self.execute(wrapped, tuple(params) + (page_size + 1, page * page_size), timeout)
+        else:
+            columns, rows = self._execute_head(sql, params, (page + 1) * page_size + 1, timeout)
+            rows = rows[page * page_size:]
+        has_more = len(rows) > page_size
+        df = pd.DataFrame.from_records(rows[:page_size], columns=columns)
+        if not has_more:
+            return ResultPage(df, page, page_size, False, page * page_size + len(df), True)
+        return ResultPage(df, page, page_size, True)
+
+    # Row count of a query, counting no further than `cap`: returns
+    # (count, exact); past the cap it's (cap, False), i.e. "more than cap"
+    def count_rows(self, sql, cap=MAX_RESULT_ROWS * 10, params=(), timeout=None):
+        if is_select(strip_sql(sql)):
+            wrapped = f"SELECT count(*) FROM (SELECT 1 FROM ({strip_sql(sql)}\n) LIMIT ?)"
+            _, rows = self.execute(wrapped, tuple(params) + (cap + 1,), timeout)
+            count = rows[0][0]
+        else:
+            count = len(self._execute_head(sql, params, cap + 1, timeout)[1])
+        return (cap, False) if count > cap else (count, True)
+
+    def table_names(self):
+        _, rows = self.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")
+        return [r[0] for r in rows]
+
+    # Cheap row-count estimate for a table: ANALYZE statistics when present,
+    # otherwise the rowid range (an index seek at each end, not a scan)
+    def estimate_table_rows(self, table):
+        try:
+            _, rows = self.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = ? LIMIT 1", (table,))
+            if rows and rows[0][0]:
+                return int(rows[0][0].split()[0])
+        except sqlite3.OperationalError:
+            pass  # no sqlite_stat1 until ANALYZE has run
+        _, rows = self.execute(f"SELECT min(rowid), max(rowid) FROM {quote_identifier(table)}")
+        low, high = rows[0]
+        return 0 if low is None else high - low + 1
+
+    # Keyset pagination over a table in rowid order: each page is an index
+    # range scan starting after the previous page's last rowid, so page N
+    # costs the same as page 1. Pass ResultPage.next_key back as `after`.
+    def browse_table(self, table, after=None, page_size=DEFAULT_PAGE_SIZE, page=0, timeout=None):
+        if table not in self.table_names():
+            raise ValueError(f"Unknown table: {table}")
+        sql = f"SELECT rowid AS _rowid_, * FROM {quote_identifier(table)}"
+        params = ()
+        if after is not None:
+            sql += " WHERE rowid > ?"
+            params = (after,)
+        sql += " ORDER BY rowid LIMIT ?"
+        columns, rows = self.execute(sql, params + (page_size + 1,), timeout)
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        df = pd.DataFrame.from_records([r[1:] for r in rows], columns=columns[1:])
+        next_key = rows[-1][0] if has_more and rows else None
+        return ResultPage(df, page, page_size, has_more, self.estimate_table_rows(table), False, next_key)
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().discard()
+            except queue.Empty:
+                return
+
+def _raise_if_timed_out(conn, error):
+    if conn.deadline is not None and time.monotonic() > conn.deadline:
+        raise QueryTimeout(f"Query exceeded the {conn.timeout:g}s time limit and was interrupted.") from error
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+# One pool per database file, shared by every session in the process
+def get_pool(db_path):
+    key = os.path.abspath(db_path)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ReadOnlyPool(key)
+        return _pools[key]
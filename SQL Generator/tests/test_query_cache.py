@@ -0,0 +1,38 @@
+import pytest
+
+from query_cache import QueryCache
+
+FINGERPRINT = "schema-1"
+
+@pytest.fixture
+def cache(tmp_path):
+    return QueryCache(str(tmp_path / "query_cache.db"))
+
+def test_exact_match_ignores_filler_words(cache):
+    cache.store("Show me all the male users", "SELECT * FROM Users WHERE gender = 'M'", FINGERPRINT)
+    assert cache.lookup("list male users", FINGERPRINT) == ("SELECT * FROM Users WHERE gender = 'M'", "exact")
+
+def test_reordered_short_question_is_a_miss(cache):
+    cache.store("Show me all the comments on posts", "SELECT * FROM Comments", FINGERPRINT)
+    assert cache.lookup("Show me posts with comments", FINGERPRINT) is None
+
+TRAVEL_SQL = "SELECT * FROM Posts WHERE content LIKE '%travel%' AND post_date > '2023-01-01'"
+
+def test_paraphrase_with_extra_filler_word_is_a_semantic_hit(cache):
+    cache.store("Show posts about travel written by users after 2023-01-01", TRAVEL_SQL, FINGERPRINT)
+    assert (cache.lookup("Show recent posts about travel written by users after 2023-01-01", FINGERPRINT)
+            == (TRAVEL_SQL, "semantic"))
+
+def test_long_question_with_different_content_word_is_a_miss(cache):
+    # Similar enough to pass the threshold; the SQL depends on the changed word
+    question = ("Show posts about travel written by verified users living in london with many likes and long "
+                "comments after 2023-01-01")
+    cache.store(question, TRAVEL_SQL, FINGERPRINT)
+    assert cache.lookup(question.replace("travel", "food"), FINGERPRINT) is None
+
+def test_semantic_hit_rejected_by_validate(cache):
+    sql = TRAVEL_SQL
+    cache.store("Show posts about travel written by users after 2023-01-01", sql, FINGERPRINT)
+    question = "Show recent posts about travel written by users after 2023-01-01"
+    assert cache.lookup(question, FINGERPRINT, validate=lambda candidate: False) is None
+    assert cache.lookup(question, FINGERPRINT, validate=lambda candidate: candidate == sql) == (sql, "semantic")
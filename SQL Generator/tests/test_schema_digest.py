@@ -0,0 +1,32 @@
+import sqlite3
+
+import pytest
+
+from schema_digest import build_digest, relevant_tables
+
+@pytest.fixture
+def digest(tmp_path):
+    path = str(tmp_path / "social.db")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE Users (user_id INTEGER PRIMARY KEY, username TEXT, gmail TEXT, age INTEGER, gender TEXT);
+        CREATE TABLE Posts (post_id INTEGER PRIMARY KEY, user_id INTEGER, content TEXT, post_date TEXT,
+                            FOREIGN KEY (user_id) REFERENCES Users(user_id));
+        CREATE TABLE Comments (comment_id INTEGER PRIMARY KEY, post_id INTEGER, user_id INTEGER, comment TEXT,
+                               comment_date TEXT, FOREIGN KEY (post_id) REFERENCES Posts(post_id),
+                               FOREIGN KEY (user_id) REFERENCES Users(user_id));
+    """)
+    conn.close()
+    return build_digest(path)
+
+def test_posts_with_authors_includes_users(digest):
+    assert relevant_tables("List the 10 most recent posts with their authors", digest) == ["Posts", "Users"]
+
+def test_users_who_never_posted_includes_posts(digest):
+    assert relevant_tables("Show me the users who have never posted anything", digest) == ["Posts", "Users"]
+
+def test_comments_pull_in_the_tables_they_reference(digest):
+    assert relevant_tables("How many spam comments are there?", digest) == ["Comments", "Posts", "Users"]
+
+def test_single_table_question_stays_narrow(digest):
+    assert relevant_tables("Show me all the male users", digest) == ["Users"]
@@ -0,0 +1,38 @@
+import sqlite3
+
+import pytest
+
+import sql_agent
+from common import tracing
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing, "METRICS_PATH", str(tmp_path / "metrics.jsonl"))
+    path = str(tmp_path / "social.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE Users (user_id INTEGER PRIMARY KEY, username TEXT)")
+    conn.commit()
+    conn.close()
+    return path
+
+@pytest.fixture
+def fallback_calls(monkeypatch):
+    calls = []
+    monkeypatch.setattr(sql_agent, "fallback_llm", lambda question, db_path: calls.append(question) or "SELECT 1")
+    return calls
+
+def test_prose_answer_without_a_query_skips_the_fallback(db_path, fallback_calls, monkeypatch):
+    monkeypatch.setattr(sql_agent, "run_agent", lambda question, **kwargs: ("I don't know how to answer that.", "", []))
+    result = sql_agent.answer_question("What is the meaning of life?", db_path=db_path, fast=False)
+    assert result.sql is None and result.df is None
+    assert result.answer == "I don't know how to answer that."
+    assert fallback_calls == []
+
+def test_agent_error_falls_back(db_path, fallback_calls, monkeypatch):
+    def broken_agent(question, **kwargs):
+        raise RuntimeError("agent parse error")
+
+    monkeypatch.setattr(sql_agent, "run_agent", broken_agent)
+    result = sql_agent.answer_question("How many users are there?", db_path=db_path, fast=False)
+    assert fallback_calls == ["How many users are there?"]
+    assert result.source == "fallback" and result.sql == "SELECT 1"
@@ -0,0 +1,117 @@
+import os
+import json
+import time
+import tempfile
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from common import tracing
+
+# Command-line options shared by the app benchmark scripts
+def add_bench_arguments(parser):
+    parser.add_argument("--concurrency", default="1,4,8",
+                        help="Comma-separated concurrency levels to run (default: 1,4,8)")
+    parser.add_argument("--repeat", type=int, default=1, help="Run every input this many times per level")
+    add_llm_arguments(parser)
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file")
+
+# LLM stand-in options (see llm_replay.py); configure_llm applies them through
+# the environment, before the app modules are imported
+def add_llm_arguments(parser):
+    parser.add_argument("--llm", choices=["replay", "record", "live"], default="replay",
+                        help="replay recorded completions (default), record them from the live API, or call it directly")
+    parser.add_argument("--cassette", default="llm_cassette.jsonl", help="Recorded completions file")
+    parser.add_argument("--latency", type=float, default=0.5, help="Simulated seconds to first token in replay mode")
+    parser.add_argument("--tokens-per-second", type=float, default=100.0,
+                        help="Simulated generation speed in replay mode (0 = instant)")
+
+def configure_llm(args):
+    if args.llm == "live":
+        os.environ.pop("LLM_MODE", None)
+        return
+    os.environ["LLM_MODE"] = args.llm
+    os.environ["LLM_CASSETTE"] = os.path.abspath(args.cassette)
+    os.environ["LLM_LATENCY"] = str(args.latency)
+    os.environ["LLM_TOKENS_PER_SECOND"] = str(args.tokens_per_second)
+
+def _percentile(values, q):
+    return float(np.percentile(values, q)) if values else None
+
+def _timed(fn, item):
+    start = time.perf_counter()
+    try:
+        fn(item)
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return time.perf_counter() - start, error
+
+# Run fn over every item at one concurrency level. Latency percentiles cover
+# successful requests; tokens and LLM calls per request come from the traces
+# the requests write (of the given kind); memory is the peak of Python
+# allocations during the level.
+def run_level(fn, items, concurrency, kind):
+    fd, metrics_path = tempfile.mkstemp(suffix=".jsonl")
+    os.close(fd)
+    previous_path = tracing.METRICS_PATH
+    tracing.METRICS_PATH = metrics_path
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(lambda item: _timed(fn, item), items))
+    finally:
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        tracing.METRICS_PATH = previous_path
+    records = tracing.load_records(metrics_path, limit=len(items) * 2, kind=kind)
+    os.remove(metrics_path)
+    summary = tracing.summarize(records)
+    latencies = [latency for latency, error in results if error is None]
+    errors = [error for _, error in results if error is not None]
+    return {
+        "concurrency": concurrency,
+        "requests": len(items),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "seconds": round(seconds, 3),
+        "throughput": round(len(items) / seconds, 3) if seconds else None,
+        "p50": _percentile(latencies, 50),
+        "p95": _percentile(latencies, 95),
+        "p99": _percentile(latencies, 99),
+        "peak_memory_mb": round(peak / 1024 / 1024, 1),
+        "llm_calls_per_request": summary["counters"].get("llm_calls"),
+        "tokens_in_per_request": summary["counters"].get("tokens_in"),
+        "tokens_out_per_request": summary["counters"].get("tokens_out"),
+        "stages": {name: round(s["p50"], 4) for name, s in summary["stages"].items() if name != "total"},
+    }
+
+def run_benchmark(fn, items, levels, kind, repeat=1):
+    items = list(items) * repeat
+    return [run_level(fn, items, concurrency, kind) for concurrency in levels]
+
+def _fmt(value, digits=3):
+    return "-" if value is None else f"{value:.{digits}f}"
+
+def print_report(name, results):
+    print(f"\n{name}")
+    print(f"{'conc':>5} {'reqs':>5} {'errs':>5} {'req/s':>8} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8} "
+          f"{'peak MB':>8} {'calls':>6} {'tok in':>8} {'tok out':>8}")
+    for r in results:
+        print(f"{r['concurrency']:>5} {r['requests']:>5} {r['errors']:>5} {_fmt(r['throughput'], 2):>8} "
+              f"{_fmt(r['p50']):>8} {_fmt(r['p95']):>8} {_fmt(r['p99']):>8} {_fmt(r['peak_memory_mb'], 1):>8} "
+              f"{_fmt(r['llm_calls_per_request'], 2):>6} {_fmt(r['tokens_in_per_request'], 0):>8} "
+              f"{_fmt(r['tokens_out_per_request'], 0):>8}")
+        if r["first_error"]:
+            print(f"      first error: {r['first_error']}")
+
+def write_json(path, name, args, results):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"benchmark": name, "settings": vars(args), "results": results}, f, indent=2)
+
+def parse_levels(text):
+    return [int(level) for level in text.split(",") if level.strip()]
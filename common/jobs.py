@@ -0,0 +1,338 @@
+import os
+import json
+import time
+import logging
+import uuid
+import pickle
+import sqlite3
+import importlib
+import threading
+import multiprocessing
+from dataclasses import dataclass
+from typing import Any, Optional
+
+# Each app keeps its queue next to its other local databases
+JOBS_PATH = "jobs.db"
+DEFAULT_WORKERS = 4
+# Seconds an idle worker waits before looking for new jobs again
+POLL_INTERVAL = 0.2
+# Finished jobs (and their results) are kept this long, so a reconnecting
+# browser can still pick them up
+RETENTION_SECONDS = 24 * 3600
+# A running job's worker renews its lease every LEASE_SECONDS / 3; a job whose
+# lease runs out belonged to a worker that died, and is requeued (or failed
+# after MAX_ATTEMPTS claims)
+LEASE_SECONDS = 30.0
+MAX_ATTEMPTS = 2
+# How often the app process expires leases and replaces dead workers
+SUPERVISE_INTERVAL = 2.0
+# A worker that exits within EARLY_EXIT_SECONDS of starting (a handler that
+# crashes on import, a broken environment) is restarted after a delay that
+# doubles from RESPAWN_BACKOFF up to MAX_RESPAWN_BACKOFF; after
+# MAX_EARLY_EXITS in a row its slot is given up
+EARLY_EXIT_SECONDS = 30.0
+RESPAWN_BACKOFF = 2.0
+MAX_RESPAWN_BACKOFF = 60.0
+MAX_EARLY_EXITS = 5
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+# A job as seen by the UI. position is the number of queued jobs ahead of it
+# (only while it is queued); progress is whatever the handler last reported.
+@dataclass
+class Job:
+    id: str
+    kind: str
+    status: str
+    result: Any = None
+    error: Optional[str] = None
+    progress: Any = None
+    created_at: float = 0.0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    position: Optional[int] = None
+
+    @property
+    def finished(self):
+        return self.status in FINISHED
+
+    @property
+    def seconds(self):
+        if self.started_at is None:
+            return None
+        return (self.finished_at or time.time()) - self.started_at
+
+# SQLite-backed job queue shared by a Streamlit app and its worker processes.
+# submit() returns a job ID straight away; a worker claims the job, runs the
+# handler registered for its kind and stores the (pickled) result, which the
+# app polls with get(). Jobs outlive reruns and reconnects of the session
+# that submitted them.
+class JobQueue:
+    def __init__(self, path=JOBS_PATH):
+        self.path = os.path.abspath(path)
+        self.workers = []
+        # Per worker slot: start time, consecutive early exits, when to respawn
+        self._slots = []
+        # Set once every worker slot has been given up
+        self.worker_error = None
+        self._handlers = None
+        self._stop = threading.Event()
+        self._supervisor = None
+        self._lock = threading.Lock()
+        # Autocommit mode: claims use explicit BEGIN IMMEDIATE transactions
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                status TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                result BLOB,
+                error TEXT,
+                progress TEXT,
+                worker INTEGER,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            )
+        ''')
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at)")
+        # Queues created before jobs had leases
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "lease_until" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN lease_until REAL")
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+
+    def submit(self, kind, payload):
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, status, payload, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, pickle.dumps(payload), time.time()),
+            )
+        return job_id
+
+    # The job with that ID, or None if it is unknown or has been purged
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, kind, status, result, error, progress, created_at, started_at, finished_at "
+                "FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            job = Job(row[0], row[1], row[2], pickle.loads(row[3]) if row[3] is not None else None, row[4],
+                      json.loads(row[5]) if row[5] else None, row[6], row[7], row[8])
+            if job.status == QUEUED:
+                job.position = self._conn.execute(
+                    "SELECT count(*) FROM jobs WHERE status = ? AND created_at < ?", (QUEUED, job.created_at)
+                ).fetchone()[0]
+        return job
+
+    # Only queued jobs can be cancelled; returns whether it was
+    def cancel(self, job_id):
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status = ?",
+                (CANCELLED, time.time(), job_id, QUEUED),
+            ).rowcount == 1
+
+    # Atomically take the oldest queued job of one of `kinds`: returns
+    # (job_id, kind, payload) or None when there is nothing to do
+    def claim(self, kinds):
+        marks = ", ".join("?" for _ in kinds)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    f"SELECT id, kind, payload FROM jobs WHERE status = ? AND kind IN ({marks}) "
+                    "ORDER BY created_at LIMIT 1", (QUEUED, *kinds)
+                ).fetchone()
+                if row is not None:
+                    now = time.time()
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, worker = ?, started_at = ?, lease_until = ?, "
+                        "attempts = attempts + 1 WHERE id = ?",
+                        (RUNNING, os.getpid(), now, now + LEASE_SECONDS, row[0]),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return None if row is None else (row[0], row[1], pickle.loads(row[2]))
+
+    # Called by the worker running the job while it is alive
+    def renew(self, job_id):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND status = ? AND worker = ?",
+                (time.time() + LEASE_SECONDS, job_id, RUNNING, os.getpid()),
+            )
+
+    def report(self, job_id, progress):
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET progress = ? WHERE id = ?",
+                               (json.dumps(progress, ensure_ascii=False, default=str), job_id))
+
+    # finish/fail only apply while this process still holds the job: one whose
+    # lease expired may already have been requeued and claimed elsewhere
+    def finish(self, job_id, result):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, finished_at = ? WHERE id = ? AND status = ? AND worker = ?",
+                (DONE, pickle.dumps(result), time.time(), job_id, RUNNING, os.getpid()),
+            )
+
+    def fail(self, job_id, error):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ? AND status = ? AND worker = ?",
+                (FAILED, error, time.time(), job_id, RUNNING, os.getpid()),
+            )
+
+    # Requeue running jobs whose lease ran out (their worker died mid-job), or
+    # fail them once they have used up MAX_ATTEMPTS; returns how many expired
+    def expire_leases(self, max_attempts=MAX_ATTEMPTS):
+        now = time.time()
+        with self._lock:
+            failed = self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? "
+                "WHERE status = ? AND lease_until < ? AND attempts >= ?",
+                (FAILED, "The worker running this job stopped responding.", now, RUNNING, now, max_attempts),
+            ).rowcount
+            requeued = self._conn.execute(
+                "UPDATE jobs SET status = ?, worker = NULL, started_at = NULL, lease_until = NULL, progress = NULL "
+                "WHERE status = ? AND lease_until < ?", (QUEUED, RUNNING, now),
+            ).rowcount
+        return failed + requeued
+
+    # Put jobs left running by workers that no longer exist (a crash or a
+    # server restart) back in the queue, and drop old finished jobs
+    def recover(self, retention_seconds=RETENTION_SECONDS):
+        live = {p.pid for p in self.workers if p.is_alive()}
+        with self._lock:
+            running = self._conn.execute("SELECT id, worker FROM jobs WHERE status = ?", (RUNNING,)).fetchall()
+            for job_id, worker in running:
+                if worker not in live:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, worker = NULL, started_at = NULL, lease_until = NULL, "
+                        "progress = NULL WHERE id = ? AND status = ?", (QUEUED, job_id, RUNNING),
+                    )
+            self._conn.execute("DELETE FROM jobs WHERE status IN (?, ?, ?) AND finished_at < ?",
+                               (*FINISHED, time.time() - retention_seconds))
+
+    # Start `processes` worker processes serving `handlers`, a dict of
+    # kind -> "module:function". Handlers are imported by name in the workers
+    # and called as function(payload, report), where report(progress) makes
+    # partial progress visible to get() while the job runs. A supervisor
+    # thread keeps the pool at full size and expires the leases of jobs whose
+    # worker died.
+    def start_workers(self, handlers, processes=DEFAULT_WORKERS):
+        self.recover()
+        self._handlers = dict(handlers)
+        self.workers = [self._spawn() for _ in range(processes)]
+        self._slots = [{"started": time.monotonic(), "early_exits": 0, "respawn_at": None} for _ in self.workers]
+        self._supervisor = threading.Thread(target=self._supervise, name="job-supervisor", daemon=True)
+        self._supervisor.start()
+        return self.workers
+
+    def _spawn(self):
+        # spawn keeps the workers free of the parent's threads (Streamlit, pools)
+        context = multiprocessing.get_context("spawn")
+        process = context.Process(target=_worker_main, args=(self.path, self._handlers, os.getpid()), daemon=True)
+        process.start()
+        return process
+
+    def _supervise(self):
+        while not self._stop.wait(SUPERVISE_INTERVAL):
+            for slot, state in enumerate(self._slots):
+                self._check_worker(slot, state)
+            if self._slots and all(state["early_exits"] >= MAX_EARLY_EXITS for state in self._slots):
+                self.worker_error = (f"Job workers keep exiting on startup (exit code "
+                                     f"{self.workers[0].exitcode}); check the server log.")
+                self._fail_queued(self.worker_error)
+            self.expire_leases()
+
+    # Respawn a dead worker, backing off while it keeps dying right after
+    # starting and giving up after MAX_EARLY_EXITS such exits in a row
+    def _check_worker(self, slot, state):
+        process = self.workers[slot]
+        if process.is_alive() or state["early_exits"] >= MAX_EARLY_EXITS:
+            return
+        now = time.monotonic()
+        if state["respawn_at"] is None:
+            if now - state["started"] < EARLY_EXIT_SECONDS:
+                state["early_exits"] += 1
+            else:
+                state["early_exits"] = 0
+            if state["early_exits"] >= MAX_EARLY_EXITS:
+                logger.error("Job worker %d exited %d times right after starting (last exit code %s); "
+                             "not restarting it", slot, state["early_exits"], process.exitcode)
+                return
+            delay = 0.0
+            if state["early_exits"]:
+                delay = min(RESPAWN_BACKOFF * 2 ** (state["early_exits"] - 1), MAX_RESPAWN_BACKOFF)
+                logger.warning("Job worker %d exited with code %s shortly after starting; restarting in %.0fs",
+                               slot, process.exitcode, delay)
+            state["respawn_at"] = now + delay
+        if now >= state["respawn_at"]:
+            self.workers[slot] = self._spawn()
+            state["started"], state["respawn_at"] = time.monotonic(), None
+
+    # With no workers left, queued jobs would wait forever: fail them so the
+    # error reaches the user
+    def _fail_queued(self, error):
+        kinds = list(self._handlers)
+        marks = ", ".join("?" for _ in kinds)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE status = ? AND kind IN ({marks})",
+                (FAILED, error, time.time(), QUEUED, *kinds),
+            )
+
+    def close(self):
+        self._stop.set()
+        if self._supervisor is not None:
+            self._supervisor.join()
+        for process in self.workers:
+            process.terminate()
+        self.workers = []
+        self._conn.close()
+
+def _load_handler(spec):
+    module_name, function_name = spec.split(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+# Worker loop; exits once the app process that started it is gone
+def _worker_main(path, handlers, parent_pid):
+    queue = JobQueue(path)
+    loaded = {}
+    kinds = list(handlers)
+    while os.getppid() == parent_pid:
+        job = queue.claim(kinds)
+        if job is None:
+            time.sleep(POLL_INTERVAL)
+            continue
+        job_id, kind, payload = job
+        # Keep the lease alive for as long as the handler runs
+        done = threading.Event()
+        heartbeat = threading.Thread(target=_heartbeat, args=(queue, job_id, done), daemon=True)
+        heartbeat.start()
+        try:
+            if kind not in loaded:
+                loaded[kind] = _load_handler(handlers[kind])
+            result = loaded[kind](payload, lambda progress: queue.report(job_id, progress))
+            queue.finish(job_id, result)
+        except Exception as e:
+            queue.fail(job_id, f"{type(e).__name__}: {e}")
+        finally:
+            done.set()
+            heartbeat.join()
+
+def _heartbeat(queue, job_id, done):
+    while not done.wait(LEASE_SECONDS / 3):
+        queue.renew(job_id)
@@ -0,0 +1,115 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Any
+
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+
+from common.tracing import CHARS_PER_TOKEN, estimate_tokens
+
+# Recorded prompt -> completion pairs, one JSON object per line
+CASSETTE_PATH = "llm_cassette.jsonl"
+MODES = ("record", "replay")
+
+_cassettes = {}
+_cassette_lock = threading.Lock()
+
+class CassetteMiss(KeyError):
+    pass
+
+def prompt_key(prompt, stop=None):
+    return hashlib.sha256(json.dumps([prompt, list(stop or [])], ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def _load_cassette(path):
+    with _cassette_lock:
+        if path not in _cassettes:
+            entries = {}
+            try:
+                with open(path, encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            entry = json.loads(line)
+                            entries[entry["key"]] = entry["completion"]
+            except FileNotFoundError:
+                pass
+            _cassettes[path] = entries
+        return _cassettes[path]
+
+def _record(path, key, prompt, completion):
+    entries = _load_cassette(path)
+    with _cassette_lock:
+        if key in entries:
+            return
+        entries[key] = completion
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"key": key, "prompt": prompt, "completion": completion}, ensure_ascii=False) + "\n")
+
+# Drop-in stand-in for the Together LLM (a LangChain LLM, so it also drives
+# the SQL agent). In "record" mode every call goes to `inner` and the
+# completion is saved to the cassette; in "replay" mode completions come from
+# the cassette only, with a simulated time to first token (`latency`) and
+# generation speed (`tokens_per_second`, 0 = instant), so runs are
+# reproducible and need no network. Prompts missing from the cassette raise
+# CassetteMiss.
+class ReplayLLM(LLM):
+    inner: Any = None
+    mode: str = "replay"
+    cassette: str = CASSETTE_PATH
+    model: str = "replay"
+    latency: float = 0.0
+    tokens_per_second: float = 0.0
+
+    @property
+    def _llm_type(self):
+        return "replay"
+
+    def _completion(self, prompt, stop):
+        key = prompt_key(prompt, stop)
+        if self.mode == "record":
+            completion = self.inner.invoke(prompt, stop=stop) if stop else self.inner.invoke(prompt)
+            _record(self.cassette, key, prompt, completion)
+            return completion
+        try:
+            return _load_cassette(self.cassette)[key]
+        except KeyError:
+            raise CassetteMiss(f"No recorded completion for this prompt in {self.cassette}") from None
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+        completion = self._completion(prompt, stop)
+        if self.mode == "replay":
+            time.sleep(self.latency + (estimate_tokens(completion) / self.tokens_per_second
+                                       if self.tokens_per_second else 0.0))
+        return completion
+
+    def _stream(self, prompt, stop=None, run_manager=None, **kwargs):
+        completion = self._completion(prompt, stop)
+        if self.mode == "replay":
+            time.sleep(self.latency)
+        for i in range(0, len(completion), CHARS_PER_TOKEN):
+            if self.mode == "replay" and self.tokens_per_second:
+                time.sleep(1.0 / self.tokens_per_second)
+            chunk = GenerationChunk(text=completion[i:i + CHARS_PER_TOKEN])
+            if run_manager is not None:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+# The app's LLM, or the stand-in wrapped around it when LLM_MODE is set
+# (record/replay). LLM_CASSETTE, LLM_LATENCY and LLM_TOKENS_PER_SECOND
+# configure it; the model name is kept so cache keys don't change.
+def wrap_llm(llm):
+    mode = os.environ.get("LLM_MODE")
+    if not mode:
+        return llm
+    if mode not in MODES:
+        raise ValueError(f"LLM_MODE must be one of {', '.join(MODES)}, not {mode!r}")
+    return ReplayLLM(
+        inner=llm if mode == "record" else None,
+        mode=mode,
+        cassette=os.environ.get("LLM_CASSETTE", CASSETTE_PATH),
+        model=getattr(llm, "model", None) or "replay",
+        latency=float(os.environ.get("LLM_LATENCY", 0)),
+        tokens_per_second=float(os.environ.get("LLM_TOKENS_PER_SECOND", 0)),
+    )
@@ -0,0 +1,230 @@
+import os
+import json
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+import numpy as np
+
+# Request traces are appended here as JSON lines (relative to the app's working
+# directory, so each app keeps its own file). Override with METRICS_PATH.
+METRICS_PATH = os.environ.get("METRICS_PATH", "metrics.jsonl")
+# The metrics file is rotated to <path>.1 once it grows past this
+MAX_METRICS_BYTES = 5 * 1024 * 1024
+# Rough characters per token, used when the provider doesn't report usage
+CHARS_PER_TOKEN = 4
+
+_current = contextvars.ContextVar("trace", default=None)
+_write_lock = threading.Lock()
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN if text else 0
+
+# One traced request (a question, an uploaded resume, ...): wall time per
+# stage, counters (llm_calls, tokens_in, tokens_out, cache_hits, cache_misses,
+# retries, ...) and free-form attributes. Stages and counters accumulate, so a
+# stage that runs twice (e.g. validate before and after a repair) adds up.
+class Trace:
+    def __init__(self, kind, **attrs):
+        self.kind = kind
+        self.attrs = dict(attrs)
+        self.stages = {}
+        self.counters = {}
+        self.error = None
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.seconds = None
+        self._lock = threading.Lock()
+
+    def add_stage(self, name, seconds):
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def annotate(self, **attrs):
+        with self._lock:
+            self.attrs.update(attrs)
+
+    def to_record(self):
+        return {
+            "ts": round(self.started, 3),
+            "kind": self.kind,
+            "seconds": round(self.seconds if self.seconds is not None else time.perf_counter() - self._start, 4),
+            "stages": {name: round(seconds, 4) for name, seconds in self.stages.items()},
+            "counters": dict(self.counters),
+            "attrs": self.attrs,
+            "error": self.error,
+        }
+
+def current_trace():
+    return _current.get()
+
+# Trace everything done inside the block as one request and append it to the
+# metrics file when the block exits (also when it raises).
+@contextmanager
+def start_trace(kind, metrics_path=None, **attrs):
+    trace = Trace(kind, **attrs)
+    token = _current.set(trace)
+    try:
+        yield trace
+    except Exception as e:
+        trace.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        trace.seconds = time.perf_counter() - trace._start
+        write_record(trace.to_record(), metrics_path)
+
+# Time a stage of the current request; a no-op outside start_trace
+@contextmanager
+def span(name):
+    trace = _current.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if trace is not None:
+            trace.add_stage(name, time.perf_counter() - start)
+
+def count(name, n=1):
+    trace = _current.get()
+    if trace is not None:
+        trace.count(name, n)
+
+def annotate(**attrs):
+    trace = _current.get()
+    if trace is not None:
+        trace.annotate(**attrs)
+
+# Count one LLM round trip. Pass the provider's token usage when it reports it;
+# otherwise tokens are estimated from the prompt and completion text.
+def record_llm_call(prompt, completion, tokens_in=None, tokens_out=None):
+    count("llm_calls")
+    count("tokens_in", estimate_tokens(prompt) if tokens_in is None else tokens_in)
+    count("tokens_out", estimate_tokens(completion) if tokens_out is None else tokens_out)
+
+# Run fn in another thread as part of the current request (context variables
+# aren't inherited by thread pool workers)
+def bind(fn):
+    trace = _current.get()
+
+    def run(*args, **kwargs):
+        token = _current.set(trace)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+    return run
+
+def write_record(record, metrics_path=None):
+    path = metrics_path or METRICS_PATH
+    line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+    with _write_lock:
+        try:
+            if os.path.getsize(path) > MAX_METRICS_BYTES:
+                os.replace(path, path + ".1")
+        except OSError:
+            pass
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+# The most recent `limit` records, optionally only those of one kind
+def load_records(metrics_path=None, limit=1000, kind=None):
+    path = metrics_path or METRICS_PATH
+    try:
+        with open(path, encoding="utf-8") as f:
+            lines = f.readlines()
+    except OSError:
+        return []
+    records = []
+    for line in reversed(lines):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if kind is None or record.get("kind") == kind:
+            records.append(record)
+            if len(records) >= limit:
+                break
+    records.reverse()
+    return records
+
+# Per-stage latency percentiles plus request-level totals:
+#   {"requests", "errors", "stages": {name: {"count", "p50", "p95", "mean"}},
+#    "counters": {name: mean per request}, "cache_hit_rate"}
+def summarize(records):
+    stages = {"total": [r["seconds"] for r in records]}
+    for record in records:
+        for name, seconds in record.get("stages", {}).items():
+            stages.setdefault(name, []).append(seconds)
+    counter_names = sorted({name for r in records for name in r.get("counters", {})})
+    hits = sum(r.get("counters", {}).get("cache_hits", 0) for r in records)
+    misses = sum(r.get("counters", {}).get("cache_misses", 0) for r in records)
+    return {
+        "requests": len(records),
+        "errors": sum(1 for r in records if r.get("error")),
+        "stages": {
+            name: {
+                "count": len(values),
+                "p50": float(np.percentile(values, 50)),
+                "p95": float(np.percentile(values, 95)),
+                "mean": float(np.mean(values)),
+            }
+            for name, values in stages.items() if values
+        },
+        "counters": {
+            name: sum(r.get("counters", {}).get(name, 0) for r in records) / len(records)
+            for name in counter_names
+        } if records else {},
+        "cache_hit_rate": hits / (hits + misses) if hits + misses else None,
+    }
+
+# Summary of the last `limit` records of one kind, recomputed only when the
+# metrics file's mtime or size changes (Streamlit reruns the panel on every
+# interaction, including the 1s job polls)
+_summary_cache = {}
+
+def cached_summary(metrics_path=None, limit=500, kind=None):
+    path = metrics_path or METRICS_PATH
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = (os.path.abspath(path), limit, kind)
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _write_lock:
+        cached = _summary_cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    records = load_records(path, limit, kind)
+    summary = summarize(records) if records else None
+    with _write_lock:
+        _summary_cache[key] = (version, summary)
+    return summary
+
+# Diagnostics panel for a Streamlit app (st is passed in so this module has no
+# Streamlit dependency for CLI and worker processes)
+def render_diagnostics(st, kind=None, metrics_path=None, limit=500):
+    summary = cached_summary(metrics_path, limit, kind)
+    if summary is None:
+        st.caption("No requests traced yet.")
+        return
+    st.caption(f"Last {summary['requests']} requests, {summary['errors']} errors"
+               + (f", cache hit rate {summary['cache_hit_rate']:.0%}" if summary["cache_hit_rate"] is not None else ""))
+    st.dataframe(
+        [
+            {"stage": name, "count": s["count"], "p50 (s)": round(s["p50"], 3), "p95 (s)": round(s["p95"], 3),
+             "mean (s)": round(s["mean"], 3)}
+            for name, s in sorted(summary["stages"].items(), key=lambda item: -item[1]["mean"])
+        ],
+        hide_index=True,
+    )
+    if summary["counters"]:
+        st.dataframe(
+            [{"counter": name, "per request": round(value, 2)} for name, value in summary["counters"].items()],
+            hide_index=True,
+        )